@@ -48,24 +48,26 @@ class ChargingRLAgent:
         
         return agent
 
+# Different load/price patterns for different districts
+DISTRICT_PATTERNS = {
+    "Chennai": {"peak_hours": [9, 10, 11, 12, 13, 18, 19, 20], "base_load": 0.7, "peak_factor": 1.5},
+    "Coimbatore": {"peak_hours": [8, 9, 10, 18, 19, 20, 21], "base_load": 0.6, "peak_factor": 1.4},
+    "Madurai": {"peak_hours": [8, 9, 10, 18, 19, 20], "base_load": 0.5, "peak_factor": 1.3},
+    "Salem": {"peak_hours": [9, 10, 18, 19, 20], "base_load": 0.5, "peak_factor": 1.2},
+    "Ramananthapuram": {"peak_hours": [8, 9, 18, 19], "base_load": 0.4, "peak_factor": 1.3},
+    "Thoothukudi": {"peak_hours": [9, 10, 11, 18, 19], "base_load": 0.5, "peak_factor": 1.4},
+    "Nagapattinam": {"peak_hours": [8, 9, 10, 18, 19], "base_load": 0.4, "peak_factor": 1.2},
+    "Dindigul": {"peak_hours": [9, 10, 18, 19], "base_load": 0.4, "peak_factor": 1.1}
+}
+
+# Used for districts not in our list
+DEFAULT_PATTERN = {"peak_hours": [9, 10, 18, 19], "base_load": 0.5, "peak_factor": 1.3}
+
 def generate_synthetic_data(district, days=30):
     """Generate synthetic load and price data for a specific district"""
     hourly_data = []
     
-    # Different patterns for different districts
-    patterns = {
-        "Chennai": {"peak_hours": [9, 10, 11, 12, 13, 18, 19, 20], "base_load": 0.7, "peak_factor": 1.5},
-        "Coimbatore": {"peak_hours": [8, 9, 10, 18, 19, 20, 21], "base_load": 0.6, "peak_factor": 1.4},
-        "Madurai": {"peak_hours": [8, 9, 10, 18, 19, 20], "base_load": 0.5, "peak_factor": 1.3},
-        "Salem": {"peak_hours": [9, 10, 18, 19, 20], "base_load": 0.5, "peak_factor": 1.2},
-        "Ramananthapuram": {"peak_hours": [8, 9, 18, 19], "base_load": 0.4, "peak_factor": 1.3},
-        "Thoothukudi": {"peak_hours": [9, 10, 11, 18, 19], "base_load": 0.5, "peak_factor": 1.4},
-        "Nagapattinam": {"peak_hours": [8, 9, 10, 18, 19], "base_load": 0.4, "peak_factor": 1.2},
-        "Dindigul": {"peak_hours": [9, 10, 18, 19], "base_load": 0.4, "peak_factor": 1.1}
-    }
-    
-    # Use default pattern if district not in our list
-    pattern = patterns.get(district, {"peak_hours": [9, 10, 18, 19], "base_load": 0.5, "peak_factor": 1.3})
+    pattern = DISTRICT_PATTERNS.get(district, DEFAULT_PATTERN)
     
     for day in range(days):
         for hour in range(24):
@@ -544,6 +546,12 @@ def main():
     summary_visual = create_summary_stats(district_schedules)
     visualizations["summary_stats"] = summary_visual
     
+    # Step 8: Evaluate the trained policies over many synthetic scenarios
+    from evaluation import evaluate_districts, save_evaluation
+    evaluation = evaluate_districts(districts)
+    save_evaluation(evaluation)
+    print(evaluation[["district", "savings_mean", "savings_p5", "savings_p95"]].to_string(index=False))
+    
     print("\n=== OPTIMIZATION COMPLETE ===\n")
     print(f"All visualizations saved to the 'visualizations' directory")
     
@@ -0,0 +1,156 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from data import DISTRICT_PATTERNS, DEFAULT_PATTERN
+from policy import load_policy
+
+
+def generate_scenario_chunk(district, n_scenarios, days=30, rng=None):
+    """Generate a chunk of synthetic load and price traces for a district
+
+    Vectorized equivalent of generate_synthetic_data: every row of the returned
+    load and price arrays is one independent scenario of days * 24 hours.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    pattern = DISTRICT_PATTERNS.get(district, DEFAULT_PATTERN)
+
+    hours = np.tile(np.arange(24), days)
+    day = np.repeat(np.arange(days), 24)
+    is_peak = np.isin(hours, pattern["peak_hours"])
+    is_night = hours < 6
+    # Later evenings and mornings on weekends
+    is_weekend_offpeak = (day % 7 >= 5) & ((hours < 9) | (hours > 20))
+
+    shape = (n_scenarios, len(hours))
+
+    # Base load with some randomness, scaled during peak hours and weekends
+    load_factor = np.where(is_peak, pattern["peak_factor"], 1.0) * np.where(is_weekend_offpeak, 1.2, 1.0)
+    loads = rng.uniform(-0.1, 0.1, shape)
+    loads += pattern["base_load"]
+    loads *= load_factor
+
+    # Price ranges: peak 7.5-9.0, night 2.8-3.5, normal 4.5-5.5
+    price_low = np.where(is_peak, 7.5, np.where(is_night, 2.8, 4.5))
+    price_high = np.where(is_peak, 9.0, np.where(is_night, 3.5, 5.5))
+    prices = rng.random(shape)
+    prices *= price_high - price_low
+    prices += price_low
+
+    return hours, loads, prices
+
+
+def iter_scenario_chunks(district, n_scenarios, days=30, chunk_size=250, seed=None):
+    """Yield scenario chunks so that only chunk_size traces are held in memory"""
+    rng = np.random.default_rng(seed)
+    remaining = n_scenarios
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield generate_scenario_chunk(district, size, days, rng)
+        remaining -= size
+
+
+def evaluate_policy(policy, district, n_scenarios=2000, days=30, chunk_size=250, seed=None):
+    """Roll a compiled policy over many synthetic scenarios and summarize the results
+
+    Savings are counted the same way as create_summary_stats: 0.1 kWh sold at the
+    current price on every discharge and 0.1 kWh bought on every charge.
+    """
+    savings = np.empty(n_scenarios)
+    action_counts = np.zeros(3, dtype=np.int64)
+    battery_total = 0.0
+    start = 0
+
+    for hours, loads, prices in iter_scenario_chunks(district, n_scenarios, days, chunk_size, seed):
+        actions, battery_levels = policy.rollout(hours, loads, prices)
+
+        signed_energy = np.where(actions == 2, 0.1, np.where(actions == 1, -0.1, 0.0))
+        savings[start:start + len(loads)] = (signed_energy * prices).sum(axis=1)
+        action_counts += np.bincount(actions.ravel(), minlength=3)
+        battery_total += battery_levels.sum()
+        start += len(loads)
+
+    n_steps = action_counts.sum()
+    action_pct = action_counts / n_steps * 100
+
+    return {
+        "district": district,
+        "scenarios": n_scenarios,
+        "savings_mean": savings.mean(),
+        "savings_std": savings.std(),
+        "savings_p5": np.percentile(savings, 5),
+        "savings_p50": np.percentile(savings, 50),
+        "savings_p95": np.percentile(savings, 95),
+        "pct_charging": action_pct[1],
+        "pct_discharging": action_pct[2],
+        "pct_idle": action_pct[0],
+        "avg_battery": battery_total / n_steps,
+    }
+
+
+def _evaluate_district(args):
+    """Worker entry point: load one district's model and evaluate it"""
+    district, model_dir, n_scenarios, days, chunk_size, seed = args
+    filepath = os.path.join(model_dir, f"{district.lower()}_model.json")
+    if not os.path.exists(filepath):
+        print(f"No existing model found for {district}")
+        return None
+
+    start_time = time.perf_counter()
+    result = evaluate_policy(load_policy(filepath), district, n_scenarios, days, chunk_size, seed)
+    result["eval_seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def evaluate_districts(districts, model_dir="models", n_scenarios=2000, days=30,
+                       chunk_size=250, seed=None, processes=None):
+    """Evaluate every district's saved policy, one process per district"""
+    # Give each district its own independent random stream
+    seeds = np.random.SeedSequence(seed).spawn(len(districts))
+    tasks = [(district, model_dir, n_scenarios, days, chunk_size, s)
+             for district, s in zip(districts, seeds)]
+
+    if processes == 1:
+        results = [_evaluate_district(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_evaluate_district, tasks))
+
+    return pd.DataFrame([r for r in results if r is not None])
+
+
+def save_evaluation(summary, output_dir="evaluations"):
+    """Save Monte Carlo evaluation summary to CSV file"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    filepath = os.path.join(output_dir, "policy_evaluation.csv")
+    summary.to_csv(filepath, index=False)
+    print(f"Policy evaluation saved to {filepath}")
+    return filepath
+
+
+def main():
+    # Districts to evaluate
+    districts = ["Chennai", "Ramananthapuram", "Thoothukudi", "Nagapattinam",
+                 "Coimbatore", "Madurai", "Salem", "Dindigul"]
+
+    print("\n=== MONTE CARLO POLICY EVALUATION ===\n")
+    start_time = time.perf_counter()
+    summary = evaluate_districts(districts)
+    elapsed = time.perf_counter() - start_time
+
+    print(summary[["district", "savings_mean", "savings_p5", "savings_p95",
+                   "pct_charging", "pct_discharging", "pct_idle"]].to_string(index=False))
+    print(f"\nEvaluated {int(summary['scenarios'].sum())} scenarios in {elapsed:.1f}s")
+    save_evaluation(summary)
+
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+import numpy as np
+from urllib.parse import urlparse
+
+
+def run_client(url, n_requests, districts, schedule_fraction, latencies, errors, seed):
+    """Issue requests over one keep-alive connection and record their latencies"""
+    rng = random.Random(seed)
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+
+    for i in range(n_requests):
+        district = rng.choice(districts)
+        if rng.random() < schedule_fraction:
+            path = "/schedule"
+            payload = {"district": district, "day": rng.randrange(7)}
+        else:
+            path = "/next-action"
+            payload = {
+                "district": district,
+                "asset": f"{district}-feeder-{seed}-{rng.randrange(50)}",
+                "hour": i % 24,
+                "load": rng.uniform(0.3, 1.2),
+                "price": rng.uniform(2.8, 9.0),
+            }
+
+        body = json.dumps(payload)
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the scheduling service")
+    parser.add_argument("--url", default="http://127.0.0.1:8050")
+    parser.add_argument("--requests", type=int, default=10000, help="Total number of requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of concurrent clients")
+    parser.add_argument("--schedule-fraction", type=float, default=0.05,
+                        help="Fraction of requests that ask for a full-day schedule")
+    parser.add_argument("--districts", default="Chennai,Coimbatore,Madurai,Salem")
+    args = parser.parse_args()
+
+    districts = args.districts.split(",")
+    per_client = max(1, args.requests // args.concurrency)
+    latencies, errors = [], []
+
+    threads = [
+        threading.Thread(target=run_client,
+                         args=(args.url, per_client, districts, args.schedule_fraction,
+                               latencies, errors, seed))
+        for seed in range(args.concurrency)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print(f"All requests failed: {errors[:5]}")
+        return
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"Requests:    {len(latencies)} ok, {len(errors)} failed")
+    print(f"Throughput:  {len(latencies) / elapsed:.0f} req/s")
+    print(f"Latency p50: {np.percentile(latencies_ms, 50):.2f} ms")
+    print(f"Latency p99: {np.percentile(latencies_ms, 99):.2f} ms")
+    print(f"Latency max: {latencies_ms.max():.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import re
+import numpy as np
+
+ACTION_NAMES = ["idle", "charge", "discharge"]
+
+# Battery levels are tracked in steps of 0.1 between 0.0 and 1.0
+CHARGE_LEVELS = 11
+
+
+def discretize_state(hour, load, price, battery_charge):
+    """Discretize a single reading the same way the trainer does"""
+    return (int(hour), int(load * 10), int(price / 2), int(battery_charge * 10))
+
+
+def step_battery(battery_charge, actions):
+    """Apply charge/discharge actions to an array of battery levels"""
+    # Same arithmetic as get_optimal_schedule so rollouts match it exactly
+    charged = np.minimum(1.0, battery_charge + 0.1)
+    discharged = np.maximum(0.0, battery_charge - 0.1)
+    return np.where(actions == 1, charged, np.where(actions == 2, discharged, battery_charge))
+
+
+class CompiledPolicy:
+    """Dense greedy-action lookup table compiled from a Q-table
+
+    Indexed as actions[hour, load_level, price_level, charge_level]. States that
+    were never visited during training map to idle, which is what argmax over
+    the agent's all-zero default Q-values returns.
+    """
+
+    def __init__(self, actions):
+        self.actions = np.ascontiguousarray(actions, dtype=np.int8)
+        self.shape = self.actions.shape
+
+    @classmethod
+    def from_agent(cls, agent):
+        """Build the lookup table from a ChargingRLAgent"""
+        return cls.from_q_table(agent.q_table)
+
+    @classmethod
+    def from_q_table(cls, q_table):
+        """Build the lookup table from a {state: q_values} mapping"""
+        states = np.array([tuple(int(s) for s in k) for k in q_table.keys()], dtype=np.int64).reshape(-1, 4)
+        shape = [24, 1, 1, CHARGE_LEVELS]
+        if len(states):
+            shape[0] = max(shape[0], int(states[:, 0].max()) + 1)
+            shape[1] = int(states[:, 1].max()) + 1
+            shape[2] = int(states[:, 2].max()) + 1
+            shape[3] = max(shape[3], int(states[:, 3].max()) + 1)
+
+        actions = np.zeros(shape, dtype=np.int8)
+        if len(states):
+            q_values = np.array([np.asarray(v, dtype=float) for v in q_table.values()])
+            actions[tuple(states.T)] = np.argmax(q_values, axis=1)
+        return cls(actions)
+
+    @classmethod
+    def from_q_array(cls, q_array):
+        """Build the lookup table from a dense (hour, load, price, charge, action) Q array"""
+        return cls(np.argmax(q_array, axis=-1))
+
+    def act(self, hour, load, price, battery_charge):
+        """Vectorized greedy actions for arrays of readings"""
+        hour = np.asarray(hour).astype(np.int64)
+        load_level = (np.asarray(load) * 10).astype(np.int64)
+        price_level = (np.asarray(price) / 2).astype(np.int64)
+        charge_level = (np.asarray(battery_charge) * 10).astype(np.int64)
+
+        index = (hour, load_level, price_level, charge_level)
+        in_range = np.ones(np.broadcast(*index).shape, dtype=bool)
+        clipped = []
+        for idx, size in zip(index, self.shape):
+            in_range &= (idx >= 0) & (idx < size)
+            clipped.append(np.clip(idx, 0, size - 1))
+
+        return np.where(in_range, self.actions[tuple(clipped)], 0).astype(np.int8)
+
+    def act_one(self, hour, load, price, battery_charge):
+        """Greedy action for a single reading without allocating arrays"""
+        state = discretize_state(hour, load, price, battery_charge)
+        for idx, size in zip(state, self.shape):
+            if idx < 0 or idx >= size:
+                return 0
+        return self.actions.item(state)
+
+    def rollout(self, hours, loads, prices, battery_charge=0.5):
+        """Roll the greedy policy forward over (n_traces, n_steps) arrays
+
+        Returns the chosen actions and the battery level after each step.
+        """
+        loads = np.atleast_2d(loads)
+        prices = np.atleast_2d(prices)
+        hours = np.broadcast_to(hours, loads.shape)
+        n_traces, n_steps = loads.shape
+
+        actions = np.empty((n_traces, n_steps), dtype=np.int8)
+        battery_levels = np.empty((n_traces, n_steps))
+        battery = np.full(n_traces, battery_charge, dtype=float)
+
+        for t in range(n_steps):
+            step_actions = self.act(hours[:, t], loads[:, t], prices[:, t], battery)
+            battery = step_battery(battery, step_actions)
+            actions[:, t] = step_actions
+            battery_levels[:, t] = battery
+
+        return actions, battery_levels
+
+    def save(self, filepath):
+        """Save the compiled table as a .npy file"""
+        np.save(filepath, self.actions)
+
+    @classmethod
+    def load(cls, filepath):
+        """Load a compiled table saved with save()"""
+        return cls(np.load(filepath))
+
+
+def load_policy(filepath):
+    """Compile a saved Q-table JSON model straight into a policy"""
+    with open(filepath, 'r') as f:
+        q_dict = json.load(f)
+
+    q_table = {}
+    for k, v in q_dict.items():
+        # Keys are stringified tuples such as "(0, 7, 1, 5)" or "(np.int64(0), 7, 1, 5)"
+        key = re.sub(r"np\.\w+\((-?\d+)\)", r"\1", k)
+        q_table[tuple(int(s) for s in key.strip("()").split(","))] = v
+
+    return CompiledPolicy.from_q_table(q_table)
@@ -0,0 +1,169 @@
+import numpy as np
+
+from policy import ACTION_NAMES, CHARGE_LEVELS
+
+# Battery moves in steps of 0.1 (one charge level) per hour
+STEP_ENERGY = 0.1
+
+_LEVELS = np.arange(CHARGE_LEVELS)
+_CHARGE_TO = np.minimum(_LEVELS + 1, CHARGE_LEVELS - 1)
+_DISCHARGE_TO = np.maximum(_LEVELS - 1, 0)
+
+
+class RecedingHorizonPlanner:
+    """Hour-by-hour re-planning over a sliding price/load horizon
+
+    Solves the charge/discharge problem over the next `horizon` hours with
+    backward dynamic programming over battery levels, using the same battery
+    model and rewards as train_rl_model. The value function of every horizon
+    step is kept between ticks in a ring buffer. When the horizon shifts or a
+    forecast point changes, steps are recomputed backward from the change only
+    until their values and decisions match the previous plan, so a tick costs
+    time proportional to how far the change actually propagates.
+
+    Values are stored relative to the empty battery (V[c] - V[0]); adding the
+    same constant to every level never changes a decision, which is what lets
+    recomputation stop early.
+    """
+
+    def __init__(self, horizon=24, salvage_price=None, tolerance=1e-9):
+        self.horizon = horizon
+        self.salvage_price = salvage_price
+        self.tolerance = tolerance
+
+        self.hours = np.zeros(horizon, dtype=np.int64)
+        self.loads = np.zeros(horizon)
+        self.prices = np.zeros(horizon)
+        self.values = np.zeros((horizon, CHARGE_LEVELS))
+        self.policy = np.zeros((horizon, CHARGE_LEVELS), dtype=np.int8)
+        self.terminal_values = np.zeros(CHARGE_LEVELS)
+
+        self.head = 0
+        self.battery_charge = 0.5
+        self.last_recomputed = 0
+
+    def _index(self, step):
+        """Physical ring-buffer index of a horizon step"""
+        return (self.head + step) % self.horizon
+
+    def _backup(self, step, next_values):
+        """One backward DP step; returns the relative values and the decision per level"""
+        i = self._index(step)
+        revenue = self.prices[i] * STEP_ENERGY
+
+        q_values = np.empty((3, CHARGE_LEVELS))
+        q_values[0] = next_values
+        # Charging at a full battery or discharging an empty one does nothing
+        q_values[1] = np.where(_LEVELS < CHARGE_LEVELS - 1, -revenue, 0.0) + next_values[_CHARGE_TO]
+        q_values[2] = np.where(_LEVELS > 0, revenue, 0.0) + next_values[_DISCHARGE_TO]
+
+        decisions = np.argmax(q_values, axis=0).astype(np.int8)
+        values = q_values[decisions, _LEVELS]
+        return values - values[0], decisions
+
+    def _recompute(self, from_step):
+        """Recompute steps from_step..0 backward, stopping once the old plan is reached"""
+        recomputed = 0
+        for step in range(from_step, -1, -1):
+            next_values = self.terminal_values if step == self.horizon - 1 else self.values[self._index(step + 1)]
+            values, decisions = self._backup(step, next_values)
+            i = self._index(step)
+            recomputed += 1
+
+            unchanged = (np.array_equal(decisions, self.policy[i])
+                         and np.allclose(values, self.values[i], rtol=0, atol=self.tolerance))
+            self.values[i] = values
+            self.policy[i] = decisions
+            if unchanged and step < from_step:
+                break
+
+        self.last_recomputed = recomputed
+        return recomputed
+
+    def plan(self, hours, loads, prices, battery_charge=0.5):
+        """Solve a fresh horizon from scratch"""
+        if len(prices) != self.horizon:
+            raise ValueError(f"Expected {self.horizon} hours of data, got {len(prices)}")
+
+        self.head = 0
+        self.hours[:] = hours
+        self.loads[:] = loads
+        self.prices[:] = prices
+        self.battery_charge = battery_charge
+
+        # Energy left in the battery at the end of the horizon is valued at a fixed
+        # salvage price so that shifting the horizon doesn't move the terminal values
+        salvage_price = self.salvage_price if self.salvage_price is not None else float(np.mean(prices))
+        self.terminal_values = salvage_price * STEP_ENERGY * _LEVELS
+
+        self.values[:] = np.nan  # Force every step to be recomputed
+        self._recompute(self.horizon - 1)
+        return self.next_action()
+
+    def charge_level(self):
+        """Discretized battery level"""
+        return min(CHARGE_LEVELS - 1, int(round(self.battery_charge * 10)))
+
+    def next_action(self):
+        """Action for the first hour of the horizon given the current battery"""
+        i = self._index(0)
+        action = int(self.policy[i, self.charge_level()])
+        return {
+            "hour": int(self.hours[i]),
+            "load": float(self.loads[i]),
+            "price": float(self.prices[i]),
+            "action": ACTION_NAMES[action],
+            "battery_level": self.battery_charge,
+        }
+
+    def advance(self, hour, load, price):
+        """Execute the current hour's action and append a newly arrived hour to the horizon
+
+        Returns the next action; only the steps affected by the new hour are recomputed.
+        """
+        action = self.policy[self._index(0), self.charge_level()]
+        if action == 1:  # Charge
+            self.battery_charge = min(1.0, self.battery_charge + STEP_ENERGY)
+        elif action == 2:  # Discharge
+            self.battery_charge = max(0.0, self.battery_charge - STEP_ENERGY)
+
+        # The executed hour's slot becomes the new last hour of the horizon
+        i = self._index(0)
+        self.hours[i] = hour
+        self.loads[i] = load
+        self.prices[i] = price
+        self.head = (self.head + 1) % self.horizon
+
+        self._recompute(self.horizon - 1)
+        return self.next_action()
+
+    def revise(self, step, load=None, price=None):
+        """Update the forecast for a horizon step and re-plan the affected steps"""
+        i = self._index(step)
+        if load is not None:
+            self.loads[i] = load
+        if price is not None and price != self.prices[i]:
+            self.prices[i] = price
+            self._recompute(step)
+        return self.next_action()
+
+    def lookahead(self):
+        """Planned actions and battery levels over the whole horizon"""
+        schedule = []
+        battery_charge = self.battery_charge
+        for step in range(self.horizon):
+            i = self._index(step)
+            level = min(CHARGE_LEVELS - 1, int(round(battery_charge * 10)))
+            action = int(self.policy[i, level])
+            if action == 1:
+                battery_charge = min(1.0, battery_charge + STEP_ENERGY)
+            elif action == 2:
+                battery_charge = max(0.0, battery_charge - STEP_ENERGY)
+            schedule.append({
+                "hour": int(self.hours[i]),
+                "load": float(self.loads[i]),
+                "price": float(self.prices[i]),
+                "action": ACTION_NAMES[action],
+                "battery_level": battery_charge,
+            })
+        return schedule
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from policy import ACTION_NAMES
+from streaming import StreamingScheduler
+
+
+class ModelPool:
+    """All district policies and datasets, loaded once at startup"""
+
+    def __init__(self, model_dir="models", data_dir="datasets"):
+        self.scheduler = StreamingScheduler.from_model_dir(model_dir)
+        self.policies = self.scheduler.policies
+
+        # Keep each district's dataset so a schedule can be requested by day
+        self.datasets = {}
+        for district in self.policies:
+            filepath = os.path.join(data_dir, f"{district}_data.csv")
+            if os.path.exists(filepath):
+                self.datasets[district] = pd.read_csv(filepath)
+
+        print(f"Loaded {len(self.policies)} district models from {model_dir}")
+
+    def day_trace(self, district, day):
+        """Hours, loads and prices of one day of a district's dataset"""
+        data = self.datasets[district]
+        day_data = data[data["day"] == day]
+        if day_data.empty:
+            raise ValueError(f"No data for day {day}")
+        return day_data["hour"].to_numpy(), day_data["load"].to_numpy(), day_data["price"].to_numpy()
+
+
+class DecisionBatcher:
+    """Group requests that arrive within a short window into one policy evaluation
+
+    Handler threads submit requests and wait on a Future; a single batching
+    thread owns the scheduler state, so battery levels need no locking.
+    """
+
+    def __init__(self, pool, window=0.002, max_batch=4096):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, request):
+        """Queue a 'next-action' or 'schedule' request and return its Future"""
+        future = Future()
+        self._queue.put((kind, request, future))
+        return future
+
+    def _collect(self):
+        """Block for the first request, then gather whatever arrives within the window"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.requests += len(batch)
+
+            groups = defaultdict(list)
+            for kind, request, future in batch:
+                groups[(kind, request["district"])].append((request, future))
+
+            for (kind, district), items in groups.items():
+                try:
+                    if kind == "next-action":
+                        self._next_actions(district, items)
+                    else:
+                        self._schedules(district, items)
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _next_actions(self, district, items):
+        """Answer next-action requests with one step_many call per distinct-asset round"""
+        scheduler = self.pool.scheduler
+        while items:
+            # An asset may appear twice in one window; later readings wait for the next round
+            seen, current, deferred = set(), [], []
+            for item in items:
+                asset = item[0]["asset"]
+                (deferred if asset in seen else current).append(item)
+                seen.add(asset)
+
+            requests = [request for request, _ in current]
+            actions, battery = scheduler.step_many(
+                district,
+                np.array([r["hour"] for r in requests]),
+                np.array([r["load"] for r in requests], dtype=float),
+                np.array([r["price"] for r in requests], dtype=float),
+                [r["asset"] for r in requests],
+            )
+            for (request, future), action, level in zip(current, actions, battery):
+                future.set_result({"district": district, "asset": request["asset"],
+                                   "action": ACTION_NAMES[action], "battery_level": float(level)})
+            items = deferred
+
+    def _schedules(self, district, items):
+        """Roll all requested traces of the same length through the policy together"""
+        policy = self.pool.policies[district]
+        by_length = defaultdict(list)
+        for request, future in items:
+            by_length[len(request["loads"])].append((request, future))
+
+        for group in by_length.values():
+            requests = [request for request, _ in group]
+            # Traces can start from different battery levels, so roll each starting level separately
+            for start in sorted({r["battery"] for r in requests}):
+                members = [(r, f) for r, f in group if r["battery"] == start]
+                hours = np.array([r["hours"] for r, _ in members])
+                loads = np.array([r["loads"] for r, _ in members], dtype=float)
+                prices = np.array([r["prices"] for r, _ in members], dtype=float)
+                actions, battery = policy.rollout(hours, loads, prices, start)
+
+                for i, (request, future) in enumerate(members):
+                    future.set_result({
+                        "district": district,
+                        "schedule": [
+                            {"hour": int(h), "load": float(l), "price": float(p),
+                             "action": ACTION_NAMES[a], "battery_level": float(b)}
+                            for h, l, p, a, b in zip(hours[i], loads[i], prices[i], actions[i], battery[i])
+                        ],
+                    })
+
+
+class SchedulingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive so clients can reuse connections
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate latency at high QPS
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_request(self):
+        """Merge query string parameters and JSON body into one dict"""
+        parsed = urlparse(self.path)
+        request = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            request.update(json.loads(self.rfile.read(length)))
+        return parsed.path.rstrip("/"), request
+
+    def _handle(self):
+        try:
+            path, request = self._read_request()
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"error": f"Invalid request: {e}"})
+
+        pool = self.server.pool
+        if path == "/health":
+            return self._send_json(200, {"status": "ok", "districts": sorted(pool.policies),
+                                         "batches": self.server.batcher.batches,
+                                         "requests": self.server.batcher.requests})
+        if path not in ("/next-action", "/schedule"):
+            return self._send_json(404, {"error": f"Unknown endpoint {path}"})
+
+        district = str(request.get("district", "")).lower()
+        if district not in pool.policies:
+            return self._send_json(404, {"error": f"No model for district '{request.get('district')}'"})
+
+        try:
+            if path == "/next-action":
+                job = {
+                    "district": district,
+                    "asset": str(request.get("asset", district)),
+                    "hour": int(request["hour"]),
+                    "load": float(request["load"]),
+                    "price": float(request["price"]),
+                }
+            else:
+                if "loads" in request and "prices" in request:
+                    loads, prices = list(request["loads"]), list(request["prices"])
+                    hours = list(request.get("hours", [h % 24 for h in range(len(loads))]))
+                    if not (len(hours) == len(loads) == len(prices)):
+                        raise ValueError("hours, loads and prices must have the same length")
+                else:
+                    hours, loads, prices = pool.day_trace(district, int(request.get("day", 0)))
+                job = {"district": district, "hours": hours, "loads": loads, "prices": prices,
+                       "battery": float(request.get("battery", 0.5))}
+        except (KeyError, ValueError, TypeError) as e:
+            return self._send_json(400, {"error": f"Invalid request: {e}"})
+
+        try:
+            result = self.server.batcher.submit(path.lstrip("/"), job).result(timeout=5)
+        except Exception as e:
+            return self._send_json(500, {"error": str(e)})
+        self._send_json(200, result)
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class SchedulingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many dispatch clients connect at once
+
+
+def create_server(host="127.0.0.1", port=8050, model_dir="models", data_dir="datasets",
+                  window=0.002, max_batch=4096):
+    """Build the HTTP server with its model pool and request batcher"""
+    server = SchedulingServer((host, port), SchedulingRequestHandler)
+    server.pool = ModelPool(model_dir, data_dir)
+    server.batcher = DecisionBatcher(server.pool, window, max_batch)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Energy storage scheduling service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--data-dir", default="datasets")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.model_dir, args.data_dir,
+                           args.batch_window_ms / 1000, args.max_batch)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import glob
+import numpy as np
+
+from policy import ACTION_NAMES, CompiledPolicy, load_policy, step_battery
+
+
+class StreamingScheduler:
+    """Online charge/discharge decisions for live hourly meter readings
+
+    Keeps one compiled policy per district and the battery level of every asset
+    it has seen, so each reading is answered with a table lookup instead of
+    rebuilding a schedule DataFrame. Battery updates follow get_optimal_schedule.
+    """
+
+    def __init__(self, policies=None, initial_charge=0.5):
+        self.policies = {}
+        self.initial_charge = initial_charge
+        self._slots = {}  # asset -> index into _battery
+        self._battery = np.full(64, initial_charge)
+
+        for district, policy in (policies or {}).items():
+            self.add_policy(district, policy)
+
+    @classmethod
+    def from_model_dir(cls, model_dir="models", initial_charge=0.5):
+        """Load every saved district model in a directory"""
+        policies = {}
+        for filepath in sorted(glob.glob(os.path.join(model_dir, "*_model.json"))):
+            district = os.path.basename(filepath)[:-len("_model.json")]
+            policies[district] = load_policy(filepath)
+        return cls(policies, initial_charge)
+
+    def add_policy(self, district, policy):
+        """Register a ChargingRLAgent or CompiledPolicy for a district"""
+        if not isinstance(policy, CompiledPolicy):
+            policy = CompiledPolicy.from_agent(policy)
+        self.policies[district.lower()] = policy
+
+    def _slot(self, asset):
+        """Index of an asset's battery level, allocating one for new assets"""
+        slot = self._slots.get(asset)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._battery):
+                grown = np.full(2 * len(self._battery), self.initial_charge)
+                grown[:slot] = self._battery
+                self._battery = grown
+            self._slots[asset] = slot
+        return slot
+
+    def battery_level(self, asset):
+        """Current battery level of an asset"""
+        slot = self._slots.get(asset)
+        return self.initial_charge if slot is None else self._battery.item(slot)
+
+    def reset(self, asset=None):
+        """Forget the battery level of one asset, or of all assets"""
+        if asset is None:
+            self._slots.clear()
+            self._battery[:] = self.initial_charge
+        elif asset in self._slots:
+            self._battery[self._slots[asset]] = self.initial_charge
+
+    def step(self, district, hour, load, price, asset=None):
+        """Decide the action for one reading and advance the asset's battery
+
+        The asset defaults to the district itself (one storage unit per district).
+        Returns the action name and the battery level after the action.
+        """
+        policy = self.policies[district.lower()]
+        slot = self._slot(district if asset is None else asset)
+        battery_charge = self._battery.item(slot)
+
+        action = policy.act_one(hour, load, price, battery_charge)
+        if action == 1:  # Charge
+            battery_charge = min(1.0, battery_charge + 0.1)
+        elif action == 2:  # Discharge
+            battery_charge = max(0.0, battery_charge - 0.1)
+
+        self._battery[slot] = battery_charge
+        return ACTION_NAMES[action], battery_charge
+
+    def step_many(self, district, hours, loads, prices, assets):
+        """Decide actions for one reading per asset in a single vectorized pass
+
+        Each asset may appear at most once per call. Returns action codes
+        (indices into ACTION_NAMES) and the battery levels after the actions.
+        """
+        policy = self.policies[district.lower()]
+        slots = np.fromiter((self._slot(a) for a in assets), dtype=np.int64, count=len(assets))
+        if len(np.unique(slots)) != len(slots):
+            raise ValueError("Each asset may only appear once per step_many call")
+
+        battery_charge = self._battery[slots]
+        actions = policy.act(hours, loads, prices, battery_charge)
+        battery_charge = step_battery(battery_charge, actions)
+
+        self._battery[slots] = battery_charge
+        return actions, battery_charge
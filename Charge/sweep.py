@@ -0,0 +1,295 @@
+import os
+import math
+import time
+import random
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from policy import CHARGE_LEVELS, CompiledPolicy
+
+# Hyperparameters exposed in the Streamlit sidebar (episodes is the halving budget)
+DEFAULT_SEARCH_SPACE = {
+    "learning_rate": [0.05, 0.1, 0.2, 0.3],
+    "discount_factor": [0.8, 0.9, 0.95, 0.99],
+    "exploration_rate": [0.05, 0.1, 0.2],
+}
+
+# State arrays for every district, set once per worker process
+_STATE_ARRAYS = {}
+
+
+def precompute_state_arrays(district_data):
+    """Discretize a district dataset once so training never touches pandas"""
+    hours = district_data["hour"].to_numpy().astype(np.int64)
+    load_levels = (district_data["load"].to_numpy() * 10).astype(np.int64)
+    price_levels = (district_data["price"].to_numpy() / 2).astype(np.int64)
+
+    shape = (24, int(load_levels.max()) + 1, int(price_levels.max()) + 1, CHARGE_LEVELS)
+
+    # Flat offset of (hour, load_level, price_level) in a dense Q array; the
+    # charge level is added at run time since it depends on the battery
+    base = ((hours * shape[1] + load_levels) * shape[2] + price_levels) * shape[3]
+
+    return {
+        "shape": shape,
+        "base": base.tolist(),
+        "hours": hours,
+        "loads": district_data["load"].to_numpy(),
+        "prices": district_data["price"].to_numpy(),
+    }
+
+
+def train_q_learning(arrays, q, lr, gamma, epsilon, episodes, start_episode=0, rng=None, battery_capacity=1.0):
+    """Run Q-learning episodes on precomputed state arrays
+
+    Same update rule, battery model and exploration decay as train_rl_model, but
+    the Q-table is a flat list indexed by precomputed state offsets. q is updated
+    in place; the decayed exploration rate is returned so training can resume.
+    """
+    rng = rng or random.Random()
+    base = arrays["base"]
+    prices = arrays["prices"].tolist()
+    n_steps = len(base)
+
+    for episode in range(start_episode, start_episode + episodes):
+        battery_charge = 0.5  # Reset battery
+
+        for idx in range(n_steps - 1):
+            s = (base[idx] + int(battery_charge * 10)) * 3
+
+            # Choose action (ties go to the lowest action, like np.argmax)
+            if rng.uniform(0, 1) < epsilon:
+                action = rng.choice([0, 1, 2])
+            else:
+                action = 0
+                if q[s + 1] > q[s]:
+                    action = 1
+                if q[s + 2] > q[s + action]:
+                    action = 2
+
+            price = prices[idx]
+            if action == 1:  # Charge
+                charge_amount = min(0.1, battery_capacity - battery_charge)
+                battery_charge += charge_amount
+                energy_cost = price * charge_amount
+            elif action == 2:  # Discharge
+                discharge_amount = min(0.1, battery_charge)
+                battery_charge -= discharge_amount
+                energy_cost = -price * discharge_amount
+            else:  # Idle
+                energy_cost = 0
+
+            reward = -energy_cost
+            ns = (base[idx + 1] + int(battery_charge * 10)) * 3
+            target = reward + gamma * max(q[ns], q[ns + 1], q[ns + 2])
+            q[s + action] += lr * (target - q[s + action])
+
+        # Reduce exploration rate over time
+        if episode % 100 == 0:
+            epsilon = max(0.01, epsilon * 0.9)
+
+    return epsilon
+
+
+def greedy_reward(arrays, q_array):
+    """Total reward of the greedy policy over the district data"""
+    policy = CompiledPolicy.from_q_array(q_array)
+    actions, battery_levels = policy.rollout(arrays["hours"], arrays["loads"], arrays["prices"])
+    previous = np.concatenate([[0.5], battery_levels[0, :-1]])
+    # Buying energy costs money, selling it earns money
+    return float(-(arrays["prices"] * (battery_levels[0] - previous)).sum())
+
+
+def grid_configs(search_space=None):
+    """Every combination of the listed hyperparameter values"""
+    search_space = search_space or DEFAULT_SEARCH_SPACE
+    names = list(search_space)
+    return [dict(zip(names, values)) for values in itertools.product(*search_space.values())]
+
+
+def random_configs(search_space, n_configs, seed=None):
+    """Sample configurations; (low, high) tuples are uniform ranges, lists are choices"""
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_configs):
+        config = {}
+        for name, values in search_space.items():
+            if isinstance(values, tuple):
+                config[name] = rng.uniform(*values)
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def _init_worker(state_arrays):
+    """Share the precomputed state arrays with every task in this worker"""
+    global _STATE_ARRAYS
+    _STATE_ARRAYS = state_arrays
+
+
+def _train_trial(trial):
+    """Worker entry point: continue training one trial up to its new budget"""
+    arrays = _STATE_ARRAYS[trial["district"]]
+    q = trial["q"].ravel().tolist() if trial["q"] is not None else [0.0] * (int(np.prod(arrays["shape"])) * 3)
+    rng = random.Random()
+    rng.setstate(trial["rng_state"])
+
+    start_time = time.perf_counter()
+    epsilon = train_q_learning(
+        arrays, q,
+        trial["learning_rate"], trial["discount_factor"], trial["epsilon"],
+        trial["budget"] - trial["episodes"], start_episode=trial["episodes"], rng=rng,
+    )
+    q_array = np.array(q).reshape(arrays["shape"] + (3,))
+
+    trial.update({
+        "q": q_array,
+        "epsilon": epsilon,
+        "episodes": trial["budget"],
+        "rng_state": rng.getstate(),
+        "wall_time": trial["wall_time"] + time.perf_counter() - start_time,
+        "final_reward": greedy_reward(arrays, q_array),
+    })
+    return trial
+
+
+def run_sweep(district_datasets, configs=None, min_episodes=100, max_episodes=1000, eta=3,
+              processes=None, seed=None):
+    """Successive-halving sweep over configs for every district in one process pool
+
+    Each rung trains the surviving trials up to the rung's episode budget, keeps
+    the best 1/eta by greedy reward and multiplies the budget by eta, until one
+    trial per district has been trained for max_episodes. Returns the leaderboard
+    and the trained trials.
+    """
+    configs = configs or grid_configs()
+    state_arrays = {d: precompute_state_arrays(df) for d, df in district_datasets.items()}
+    seeder = random.Random(seed)
+
+    alive = []
+    for district in district_datasets:
+        for config_id, config in enumerate(configs):
+            alive.append({
+                "district": district,
+                "config_id": config_id,
+                "learning_rate": config["learning_rate"],
+                "discount_factor": config["discount_factor"],
+                "exploration_rate": config["exploration_rate"],
+                "epsilon": config["exploration_rate"],
+                "q": None,
+                "episodes": 0,
+                "rng_state": random.Random(seeder.random()).getstate(),
+                "wall_time": 0.0,
+            })
+
+    finished = []
+    budget = min(min_episodes, max_episodes)
+    rung = 0
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(state_arrays,)) as executor:
+        while alive:
+            for trial in alive:
+                trial["budget"] = budget
+                trial["rung"] = rung
+            trained = list(executor.map(_train_trial, alive))
+            print(f"Rung {rung}: trained {len(trained)} trials to {budget} episodes")
+
+            if budget >= max_episodes:
+                finished.extend(trained)
+                break
+
+            # Keep the best 1/eta of each district's trials
+            alive = []
+            for district in district_datasets:
+                trials = sorted((t for t in trained if t["district"] == district),
+                                key=lambda t: t["final_reward"], reverse=True)
+                keep = max(1, math.ceil(len(trials) / eta)) if len(trials) > 1 else 1
+                alive.extend(trials[:keep])
+                for trial in trials[keep:]:
+                    trial["q"] = None  # Pruned trials don't need their Q-tables
+                finished.extend(trials[keep:])
+
+            budget = min(budget * eta, max_episodes)
+            rung += 1
+
+    leaderboard = pd.DataFrame([
+        {k: t[k] for k in ("district", "config_id", "learning_rate", "discount_factor",
+                           "exploration_rate", "rung", "episodes", "final_reward", "wall_time")}
+        for t in finished
+    ])
+    leaderboard = leaderboard.sort_values(["district", "episodes", "final_reward"],
+                                          ascending=[True, False, False]).reset_index(drop=True)
+    leaderboard["rank"] = leaderboard.groupby("district").cumcount() + 1
+
+    return leaderboard, finished
+
+
+def best_agents(trials):
+    """Convert the best fully trained trial of each district into a ChargingRLAgent"""
+    from data import ChargingRLAgent
+
+    best = {}
+    for trial in trials:
+        if trial["q"] is None:
+            continue
+        current = best.get(trial["district"])
+        if current is None or trial["final_reward"] > current["final_reward"]:
+            best[trial["district"]] = trial
+
+    agents = {}
+    for district, trial in best.items():
+        agent = ChargingRLAgent(trial["learning_rate"], trial["discount_factor"], trial["epsilon"])
+        q_array = trial["q"]
+        # Only keep states the agent actually learned something about
+        for state in zip(*np.nonzero(np.any(q_array != 0, axis=-1))):
+            agent.q_table[tuple(int(s) for s in state)] = q_array[state].copy()
+        agents[district] = agent
+
+    return agents
+
+
+def save_leaderboard(leaderboard, output_dir="sweeps"):
+    """Save sweep leaderboard to CSV file"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    filepath = os.path.join(output_dir, "leaderboard.csv")
+    leaderboard.to_csv(filepath, index=False)
+    print(f"Leaderboard saved to {filepath}")
+    return filepath
+
+
+def main():
+    from data import load_dataset, generate_synthetic_data, save_dataset, save_model
+
+    # Districts to tune
+    districts = ["Chennai", "Ramananthapuram", "Thoothukudi", "Nagapattinam",
+                 "Coimbatore", "Madurai", "Salem", "Dindigul"]
+
+    district_datasets = {}
+    for district in districts:
+        data = load_dataset(district)
+        if data is None:
+            data = generate_synthetic_data(district)
+            save_dataset(data, district)
+        district_datasets[district] = data
+
+    print("\n=== HYPERPARAMETER SWEEP ===\n")
+    start_time = time.perf_counter()
+    leaderboard, trials = run_sweep(district_datasets)
+    print(f"\nSweep finished in {time.perf_counter() - start_time:.1f}s")
+
+    save_leaderboard(leaderboard)
+    print(leaderboard[leaderboard["rank"] == 1].to_string(index=False))
+
+    for district, agent in best_agents(trials).items():
+        save_model(agent, district, model_dir=os.path.join("sweeps", "models"))
+
+    return leaderboard
+
+
+if __name__ == "__main__":
+    main()
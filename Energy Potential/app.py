@@ -19,6 +19,8 @@ from prediction import (
     fetch_forecast_data,
     generate_forecast_report
 )
+from forecast_cache import ForecastCache
+from forecast_store import ForecastStore
 
 # Define the available districts
 districts = {
@@ -36,8 +38,9 @@ districts = {
 @st.cache_resource
 def load_models(model_dir='./saved_models'):
     try:
-        models = RenewableEnergyModels(model_dir)
-        if models.wind_model is None or models.solar_model is None:
+        # Wind and solar are needed for every district; ocean loads on the first coastal forecast
+        models = RenewableEnergyModels(model_dir, prefetch=('wind', 'solar'))
+        if not models.available('wind') or not models.available('solar'):
             st.error("Failed to load required models. Please check if model files exist in the specified directory.")
             return None
         return models
@@ -45,27 +48,48 @@ def load_models(model_dir='./saved_models'):
         st.error(f"Error initializing models: {e}")
         return None
 
+# Finished forecasts shared by all sessions; reused while the models and weather are unchanged
+@st.cache_resource
+def load_forecast_cache():
+    return ForecastCache(max_entries=512)
+
+# Forecasts precomputed by forecast_daemon.py; older ones are computed on demand instead
+STORE_MAX_AGE = timedelta(hours=3)
+
+@st.cache_resource
+def load_forecast_store(directory='forecast_store'):
+    return ForecastStore(directory)
+
 # Function to generate forecasts
 def generate_forecasts(selected_districts, forecast_days, models):
-    forecaster = RenewableEnergyForecaster(models)
-    district_forecasts = {}
-    progress_bar = st.progress(0)
+    # Districts the daemon precomputed with the same models are read from the store
+    snapshot = load_forecast_store().read(forecast_days, models.version(), STORE_MAX_AGE)
+    stored = snapshot['district_forecasts'] if snapshot else {}
+    missing = [name for name in selected_districts if name not in stored]
     
-    for i, name in enumerate(selected_districts):
-        progress_bar.progress((i) / len(selected_districts))
+    computed = {}
+    if missing:
+        forecaster = RenewableEnergyForecaster(models, cache=load_forecast_cache())
         status_text = st.empty()
-        status_text.text(f"Generating forecast for {name}...")
+        status_text.text(f"Generating forecasts for {len(missing)} districts...")
         
-        info = districts[name]
-        forecast = forecaster.forecast_district_energy(name, info, forecast_days)
-        
-        if forecast:
-            district_forecasts[name] = forecast
+        # All missing districts are fetched in a single API request
+        computed = forecaster.forecast_districts(
+            {name: districts[name] for name in missing},
+            forecast_days
+        )
         
-        progress_bar.progress((i + 1) / len(selected_districts))
+        status_text.empty()
     
-    progress_bar.empty()
-    return district_forecasts
+    district_forecasts = {}
+    for name in selected_districts:
+        if name in stored:
+            district_forecasts[name] = stored[name]
+        elif name in computed:
+            district_forecasts[name] = computed[name]
+    
+    updated_at = snapshot['updated_at'] if snapshot and len(missing) < len(selected_districts) else None
+    return district_forecasts, updated_at
 
 # Function to create daily forecast plot with Plotly
 def plot_daily_forecast(district_forecast, district_name):
@@ -295,16 +319,17 @@ def main():
     # Load models
     load_models_button = st.button("Load Models")
     
-    if load_models_button or 'models' in st.session_state:
-        if 'models' not in st.session_state:
-            with st.spinner("Loading prediction models..."):
-                models = load_models(model_dir)
-                if models:
-                    st.session_state.models = models
-                    st.success("Models loaded successfully!")
-                else:
-                    st.error("Failed to load models. Please check the model directory.")
-                    return
+    if load_models_button or st.session_state.get('models_loaded'):
+        # The models live in the process-wide store shared by all sessions (and memory-mapped
+        # across processes); a session only remembers that it loaded them
+        with st.spinner("Loading prediction models..."):
+            models = load_models(model_dir)
+        if not models:
+            st.error("Failed to load models. Please check the model directory.")
+            return
+        if not st.session_state.get('models_loaded'):
+            st.session_state.models_loaded = True
+            st.success("Models loaded successfully!")
         
         # Generate forecasts button
         forecast_button = st.button("Generate Forecasts")
@@ -314,15 +339,16 @@ def main():
                 st.warning("Please select at least one district to generate forecasts.")
             else:
                 with st.spinner("Generating forecasts..."):
-                    district_forecasts = generate_forecasts(
+                    district_forecasts, updated_at = generate_forecasts(
                         selected_districts, 
                         forecast_days, 
-                        st.session_state.models
+                        models
                     )
                     
                     if district_forecasts:
                         st.session_state.district_forecasts = district_forecasts
                         st.session_state.report = generate_forecast_report(district_forecasts)
+                        st.session_state.forecast_updated_at = updated_at
                         st.success("Forecasts generated successfully!")
                     else:
                         st.error("Failed to generate forecasts. Please try again.")
@@ -338,6 +364,11 @@ def main():
             with tab1:
                 st.header("Overview")
                 
+                # Freshness of the districts read from the precomputed store
+                updated_at = st.session_state.get('forecast_updated_at')
+                if updated_at is not None:
+                    st.caption(f"Precomputed forecasts from {updated_at:%Y-%m-%d %H:%M} UTC")
+                
                 # Display forecast period
                 st.subheader("Forecast Period")
                 col1, col2 = st.columns(2)
@@ -0,0 +1,116 @@
+import os
+import time
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import r2_score
+from threadpoolctl import threadpool_limits
+
+from openmeteo_stub import synthetic_weather, resolve_times
+from weather_download import HOURLY_VARIABLES
+from model import RenewableEnergyModels, ESTIMATOR_BACKENDS, make_estimator, districts
+
+
+def synthetic_districts(start_date, end_date):
+    """Hourly synthetic weather for every district, shaped like the cleaned training data"""
+    times = resolve_times({"start_date": start_date, "end_date": end_date}, 0)
+    districts_data = {}
+    for name, info in districts.items():
+        df = pd.DataFrame(synthetic_weather(info["lat"], info["lon"], times, HOURLY_VARIABLES))
+        df.insert(0, "datetime", pd.to_datetime(times, unit="s"))
+        df["hour"] = df["datetime"].dt.hour
+        df["month"] = df["datetime"].dt.month
+        df["day_of_year"] = df["datetime"].dt.dayofyear
+        df["latitude"] = info["lat"]
+        districts_data[name] = df
+    return districts_data
+
+
+def build_dataset(models, districts_data, energy_type):
+    """Scaled features and targets of one energy type, split the way training splits them"""
+    frames, targets = [], []
+    for name, df in districts_data.items():
+        if energy_type == "ocean" and not districts[name]["coastal"]:
+            continue
+        features = models.prepare_features(df, (energy_type,))[energy_type]
+        frames.append(features)
+        targets.append(models.generate_target_values(features, energy_type))
+
+    X = pd.concat(frames)
+    y = pd.concat(targets)
+    scaler = getattr(models, f"{energy_type}_scaler")
+    return train_test_split(scaler.fit_transform(X), y.to_numpy(), test_size=0.2, random_state=42)
+
+
+def benchmark_backend(backend, X_train, X_test, y_train, y_test, n_jobs, repeats):
+    """Fit time, single-forecast latency, batch throughput, pickled size and R² of one backend"""
+    model = make_estimator(backend, n_jobs)
+    with threadpool_limits(limits=n_jobs):
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        # One district's 7-day hourly forecast
+        week = X_test[:168]
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(week)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        batch_time = time.perf_counter() - start
+
+    return {
+        "fit_s": fit_time,
+        "predict_week_ms": np.median(latencies) * 1000,
+        "predict_rows_per_s": len(X_test) / batch_time,
+        "size_mb": len(pickle.dumps(model)) / 1e6,
+        "r2": r2_score(y_test, y_pred),
+    }
+
+
+def save_benchmark(results, filepath="benchmarks/estimator_benchmark.csv"):
+    """Save benchmark results to CSV"""
+    directory = os.path.dirname(filepath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    results.to_csv(filepath, index=False)
+    print(f"Benchmark saved to {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare estimator backends for the energy models")
+    parser.add_argument("--start-date", default="2024-05-03")
+    parser.add_argument("--end-date", default="2025-01-01")
+    parser.add_argument("--energy-types", default="wind,solar,ocean")
+    parser.add_argument("--backends", default=",".join(ESTIMATOR_BACKENDS))
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", default="benchmarks/estimator_benchmark.csv")
+    args = parser.parse_args()
+
+    np.random.seed(42)  # Synthetic targets include noise
+    districts_data = synthetic_districts(args.start_date, args.end_date)
+    print(f"Synthetic data: {len(districts_data)} districts, "
+          f"{sum(len(df) for df in districts_data.values())} hourly rows")
+
+    models = RenewableEnergyModels()
+    rows = []
+    for energy_type in args.energy_types.split(","):
+        X_train, X_test, y_train, y_test = build_dataset(models, districts_data, energy_type)
+        for backend in args.backends.split(","):
+            print(f"Benchmarking {energy_type} / {backend}...")
+            result = benchmark_backend(backend, X_train, X_test, y_train, y_test, args.n_jobs, args.repeats)
+            rows.append({"energy_type": energy_type, "backend": backend, "train_rows": len(X_train), **result})
+
+    results = pd.DataFrame(rows)
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    save_benchmark(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
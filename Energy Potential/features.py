@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+import solar_geometry
+
+# Feature columns of each model, in the order the prepare_*_features methods produce them
+FEATURE_COLUMNS = {
+    "wind": [
+        "wind_speed_10m",
+        "wind_speed_80m",
+        "wind_speed_120m",
+        "wind_gusts_10m",
+        "surface_pressure",
+        "hour",
+        "month",
+        "temperature_kelvin",
+        "air_density",
+    ],
+    "solar": [
+        "temperature_2m",
+        "cloud_cover",
+        "hour",
+        "month",
+        "day_of_year",
+        "solar_zenith",
+        "clearsky_irradiance",
+        "estimated_irradiance",
+    ],
+    "ocean": [
+        "wind_speed_10m",
+        "wind_gusts_10m",
+        "surface_pressure",
+        "wind_direction_10m",
+        "hour",
+        "month",
+        "estimated_wave_height",
+        "day_in_lunar_cycle",
+        "tide_factor",
+    ],
+}
+
+R = 287.05  # Gas constant for dry air in J/(kg·K)
+
+
+class FeatureBuilder:
+    """
+    Build the wind, solar and ocean feature sets in one pass
+
+    Every base and derived feature is computed once, even when several models
+    use it, and written into a single float32 matrix laid out as one
+    contiguous column block per model. Each model gets a DataFrame view of its
+    block, with columns in the order its scaler was fitted on.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = {energy_type: list(names) for energy_type, names in (columns or FEATURE_COLUMNS).items()}
+
+    @classmethod
+    def from_scalers(cls, scalers):
+        """Use the feature order each fitted scaler recorded (energy type -> scaler)"""
+        columns = dict(FEATURE_COLUMNS)
+        for energy_type, scaler in scalers.items():
+            names = getattr(scaler, "feature_names_in_", None)
+            if names is not None:
+                columns[energy_type] = list(names)
+        return cls(columns)
+
+    def build(self, data, energy_types=("wind", "solar", "ocean")):
+        """
+        Compute the feature blocks of the given energy types
+
+        Parameters:
+        data (DataFrame): Weather data with hour, month, day_of_year and latitude
+        energy_types (tuple): Blocks to build
+
+        Returns:
+        dict: Energy type mapped to a DataFrame view of its block of the shared matrix
+        """
+        blocks = {}
+        width = 0
+        for energy_type in energy_types:
+            blocks[energy_type] = (width, width + len(self.columns[energy_type]))
+            width += len(self.columns[energy_type])
+
+        matrix = np.empty((len(data), width), dtype=np.float32)
+        # Features already written, as views of their first column in the matrix
+        written = {}
+
+        def column(name):
+            if name in written:
+                return written[name]
+            if name in data:
+                return np.asarray(data[name], dtype=np.float32)
+            return compute(name)
+
+        def compute(name):
+            if name == "temperature_kelvin":
+                return column("temperature_2m") + np.float32(273.15)
+            if name == "air_density":
+                return column("surface_pressure") * 100 / (R * column("temperature_kelvin"))
+            if name in ("solar_zenith", "clearsky_irradiance"):
+                # Training and serving share the same precomputed solar geometry tables
+                if "latitude" not in data:
+                    raise ValueError("Solar features need a 'latitude' column")
+                lookup = getattr(solar_geometry, name)
+                return lookup(np.asarray(data["hour"]), np.asarray(data["day_of_year"]), np.asarray(data["latitude"]))
+            if name == "estimated_irradiance":
+                return column("clearsky_irradiance") * (1 - column("cloud_cover") / 100 * 0.75)
+            if name == "estimated_wave_height":
+                return 0.0015 * column("wind_speed_10m") ** 2 * np.log(column("wind_gusts_10m"))
+            if name == "day_in_lunar_cycle":
+                # Simplified tide model based on the lunar cycle
+                return (np.asarray(data["day_of_year"]) % 29.53).astype(int)
+            if name == "tide_factor":
+                return np.sin(2 * np.pi * column("day_in_lunar_cycle") / 29.53)
+            return np.asarray(data[name])
+
+        # Each feature is computed once; later blocks copy the column already written
+        features = {}
+        for energy_type, (start, end) in blocks.items():
+            names = self.columns[energy_type]
+            for j, name in enumerate(names):
+                matrix[:, start + j] = written[name] if name in written else compute(name)
+                written.setdefault(name, matrix[:, start + j])
+            features[energy_type] = pd.DataFrame(matrix[:, start:end], columns=names, copy=False)
+
+        return features
@@ -0,0 +1,115 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def weather_fingerprint(times, values):
+    """
+    Hash of one location's forecast arrays
+
+    Parameters:
+    times (numpy.ndarray): int64 epoch seconds of shape (hours,)
+    values (numpy.ndarray): float32 weather of shape (hours, variables)
+
+    Returns:
+    str: Hex digest that changes whenever any time or value changes
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(times, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(values, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    """
+    LRU cache of finished forecasts keyed by (model version, district, weather fingerprint)
+
+    A hit returns the stored forecast dict itself, so callers must treat it
+    as read-only. With a directory, every entry is also pickled to disk and
+    read back when it isn't in memory, so forecasts survive restarts.
+    """
+
+    def __init__(self, max_entries=512, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(model_version, district_name, district_info, times, values):
+        """Cache key of one district's forecast"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{model_version}|{district_name}|{district_info['lat']}|{district_info['lon']}|"
+                      f"{bool(district_info['coastal'])}|".encode())
+        digest.update(weather_fingerprint(times, values).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """Return the cached forecast, or None"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        result = None
+        if self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    result = pickle.load(f)
+            except Exception as e:
+                print(f"Error loading cached forecast {key}: {e}")
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, result)
+        return result
+
+    def put(self, key, result):
+        """Store a forecast"""
+        with self._lock:
+            self._insert(key, result)
+
+        if self.directory:
+            # Write next to the destination and rename, so readers never see a partial file
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+
+    def _insert(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every in-memory entry (files on disk are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit, miss and size counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,84 @@
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from prediction import (
+    RenewableEnergyModels,
+    RenewableEnergyForecaster,
+    generate_forecast_report,
+    districts,
+    http_cache
+)
+from forecast_store import ForecastStore
+
+
+def refresh_once(forecasters, store):
+    """
+    Refresh every horizon's forecasts of all districts and write them to the store
+
+    Parameters:
+    forecasters (dict): Forecast days mapped to the forecaster that keeps that horizon
+    store (ForecastStore): Where the results are written
+    """
+    for forecast_days, forecaster in forecasters.items():
+        start = time.perf_counter()
+        try:
+            district_forecasts = forecaster.refresh(districts, forecast_days)
+        except Exception as e:
+            print(f"Error refreshing {forecast_days}-day forecasts: {e}")
+            continue
+        if not district_forecasts:
+            print(f"Error: No {forecast_days}-day forecasts could be computed")
+            continue
+
+        report = generate_forecast_report(district_forecasts)
+        store.write(district_forecasts, report, forecast_days, forecaster.models.version())
+        print(f"{forecast_days}-day forecasts refreshed in {time.perf_counter() - start:.2f}s")
+
+
+def next_run(interval_minutes):
+    """Next refresh time (UTC): after a fixed interval, or after the next upstream forecast update"""
+    if interval_minutes > 0:
+        return datetime.now(timezone.utc) + timedelta(minutes=interval_minutes)
+    return http_cache.next_refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep precomputed forecasts of every district up to date")
+    parser.add_argument("--model-dir", default="./saved_models")
+    parser.add_argument("--store", default="forecast_store")
+    parser.add_argument("--forecast-days", default="7",
+                        help="Comma-separated horizons to keep, e.g. 7,16")
+    parser.add_argument("--interval-minutes", type=float, default=0,
+                        help="Minutes between refreshes (0 follows the upstream forecast cycle)")
+    parser.add_argument("--once", action="store_true", help="Refresh once and exit")
+    args = parser.parse_args()
+
+    models = RenewableEnergyModels(args.model_dir)
+    if not models.available("wind") or not models.available("solar"):
+        print(f"Error: Required models not found in '{args.model_dir}'.")
+        return
+
+    # One forecaster per horizon, so each keeps its own window between refreshes
+    forecasters = {int(days): RenewableEnergyForecaster(models) for days in args.forecast_days.split(",")}
+    store = ForecastStore(args.store)
+
+    version = models.version()
+    while True:
+        # Models retrained since the last refresh make the kept energy stale
+        models.loader.clear()
+        if models.version() != version:
+            print("Saved models changed, recomputing every forecast")
+            version = models.version()
+            forecasters = {days: RenewableEnergyForecaster(models) for days in forecasters}
+
+        refresh_once(forecasters, store)
+        if args.once:
+            break
+
+        wake = next_run(args.interval_minutes)
+        print(f"Next refresh at {wake:%Y-%m-%d %H:%M} UTC")
+        time.sleep(max((wake - datetime.now(timezone.utc)).total_seconds(), 0))
+
+if __name__ == "__main__":
+    main()
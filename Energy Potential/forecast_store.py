@@ -0,0 +1,101 @@
+import os
+import pickle
+import threading
+from datetime import datetime, timezone
+
+
+class ForecastStore:
+    """
+    Precomputed forecasts written by forecast_daemon.py and read by the app
+
+    Each forecast horizon is one snapshot file holding every district's
+    forecast, the report and when it was computed. Snapshots are replaced
+    atomically, so readers see either the old or the new one, and a reader
+    unpickles a snapshot only once per write.
+    """
+
+    def __init__(self, directory="forecast_store"):
+        self.directory = directory
+        self._loaded = {}  # forecast_days -> (modification time, snapshot)
+        self._lock = threading.Lock()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _path(self, forecast_days):
+        return os.path.join(self.directory, f"forecasts_{forecast_days}d.pkl")
+
+    def write(self, district_forecasts, report, forecast_days, model_version=None):
+        """
+        Replace the snapshot of a forecast horizon
+
+        Parameters:
+        district_forecasts (dict): Forecast results per district
+        report (dict): Report of these forecasts (see generate_forecast_report)
+        forecast_days (int): Number of days forecast
+        model_version (str): Version of the models that computed them
+
+        Returns:
+        datetime: When the snapshot was written (UTC)
+        """
+        updated_at = datetime.now(timezone.utc)
+        snapshot = {
+            "updated_at": updated_at,
+            "forecast_days": forecast_days,
+            "model_version": model_version,
+            "district_forecasts": district_forecasts,
+            "report": report,
+        }
+
+        # Write next to the destination and rename, so readers never see a partial file
+        path = self._path(forecast_days)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"Forecasts for {len(district_forecasts)} districts saved to {path}")
+        return updated_at
+
+    def read(self, forecast_days, model_version=None, max_age=None):
+        """
+        Latest snapshot of a forecast horizon
+
+        Parameters:
+        forecast_days (int): Number of days forecast
+        model_version (str): If given, snapshots computed by other models are ignored
+        max_age (timedelta): If given, older snapshots are ignored
+
+        Returns:
+        dict: Snapshot with updated_at, forecast_days, model_version, district_forecasts
+              and report (treat as read-only), or None if there is no usable one
+        """
+        path = self._path(forecast_days)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            loaded = self._loaded.get(forecast_days)
+        if loaded is not None and loaded[0] == mtime:
+            snapshot = loaded[1]
+        else:
+            try:
+                with open(path, "rb") as f:
+                    snapshot = pickle.load(f)
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                return None
+            with self._lock:
+                self._loaded[forecast_days] = (mtime, snapshot)
+
+        if model_version is not None and snapshot["model_version"] != model_version:
+            return None
+        if max_age is not None and datetime.now(timezone.utc) - snapshot["updated_at"] > max_age:
+            return None
+        return snapshot
+
+    def updated_at(self, forecast_days):
+        """When the snapshot of a forecast horizon was written (UTC), or None"""
+        snapshot = self.read(forecast_days)
+        return snapshot["updated_at"] if snapshot is not None else None
@@ -0,0 +1,166 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from requests_cache import CachedSession
+from requests_cache.backends.sqlite import SQLiteCache
+
+
+class ForecastCycleSession(CachedSession):
+    """CachedSession whose responses expire when the upstream forecast next refreshes"""
+
+    def __init__(self, manager, **kwargs):
+        super().__init__(backend=manager.backend, **kwargs)
+        self.manager = manager
+
+    def send(self, request, expire_after=None, **kwargs):
+        if expire_after is None:
+            expire_after = self.manager.next_refresh()
+        response = super().send(request, expire_after=expire_after, **kwargs)
+        self.manager.record(response)
+        return response
+
+
+class HttpCacheManager:
+    """
+    Bounded SQLite cache for Open-Meteo responses
+
+    - Responses expire at the next upstream refresh (every refresh_hours, plus
+      the delay until a new run is served) rather than a fixed time after
+      they were fetched, so every process fetches each run once.
+    - The database runs in WAL mode, so processes sharing the file read
+      concurrently while one of them writes.
+    - Stored responses are capped at max_bytes: whenever they grow past it,
+      expired responses go first and then the least recently used ones.
+      SQLite reuses the freed pages, so the file stays near the cap.
+    - Hits, misses, evictions and sizes are counted (see stats()).
+
+    Parameters:
+    cache_name (str): SQLite file, without the .sqlite suffix
+    max_bytes (int): Cap on the size of the stored responses
+    refresh_hours (int): Hours between upstream forecast updates
+    refresh_delay (timedelta): Time after each update until the new data is served
+    check_every (int): Requests between size checks
+    """
+
+    def __init__(self, cache_name=".cache", max_bytes=20 * 2**20, refresh_hours=1,
+                 refresh_delay=timedelta(minutes=10), check_every=20):
+        self.backend = SQLiteCache(cache_name, wal=True, busy_timeout=30000)
+        self.db_path = str(self.backend.responses.db_path)
+        self.max_bytes = max_bytes
+        self.refresh_hours = refresh_hours
+        self.refresh_delay = refresh_delay
+        self.check_every = check_every
+
+        self._lock = threading.Lock()
+        self._last_used = {}  # Cache key -> time, written to the database at the next size check
+        self._requests_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        with self._connect() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS last_used (key TEXT PRIMARY KEY, time REAL)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        con = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def session(self, **kwargs):
+        """A new session backed by this cache"""
+        return ForecastCycleSession(self, **kwargs)
+
+    def next_refresh(self, now=None):
+        """Time the upstream forecast is next refreshed (UTC)"""
+        now = now or datetime.now(timezone.utc)
+        cycle = timedelta(hours=self.refresh_hours)
+        since_epoch = now - self.refresh_delay - datetime(1970, 1, 1, tzinfo=timezone.utc)
+        last_update = datetime(1970, 1, 1, tzinfo=timezone.utc) + (since_epoch // cycle) * cycle
+        return last_update + cycle + self.refresh_delay
+
+    def record(self, response):
+        """Count a response and note when its cache entry was used"""
+        key = getattr(response, "cache_key", None)
+        with self._lock:
+            if getattr(response, "from_cache", False):
+                self.hits += 1
+            else:
+                self.misses += 1
+            if key:
+                self._last_used[key] = time.time()
+            self._requests_since_check += 1
+            check = self._requests_since_check >= self.check_every
+            if check:
+                self._requests_since_check = 0
+        if check:
+            self.enforce_limit()
+
+    def enforce_limit(self):
+        """
+        Evict responses until the stored size is under the cap
+
+        Returns:
+        int: Number of responses evicted
+        """
+        with self._lock:
+            last_used, self._last_used = self._last_used, {}
+
+        with self._connect() as con:
+            con.executemany("INSERT OR REPLACE INTO last_used VALUES (?, ?)", last_used.items())
+            if self.stored_bytes(con) <= self.max_bytes:
+                return 0
+
+        self.backend.delete(expired=True)
+        evicted = []
+        with self._connect() as con:
+            total = self.stored_bytes(con)
+            # Entries never used through a manager count as the oldest
+            rows = con.execute(
+                "SELECT r.key, LENGTH(r.value) FROM responses r "
+                "LEFT JOIN last_used u ON u.key = r.key ORDER BY COALESCE(u.time, 0)"
+            )
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size or 0
+        if evicted:
+            self.backend.delete(*evicted)
+
+        with self._connect() as con:
+            con.execute("DELETE FROM last_used WHERE key NOT IN (SELECT key FROM responses)")
+        with self._lock:
+            self.evictions += len(evicted)
+        return len(evicted)
+
+    def stored_bytes(self, con=None):
+        """Total size of the stored responses"""
+        if con is None:
+            with self._connect() as con:
+                return self.stored_bytes(con)
+        return con.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM responses").fetchone()[0]
+
+    def stats(self):
+        """Hit, miss, eviction and size counters"""
+        with self._connect() as con:
+            entries = con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            stored = self.stored_bytes(con)
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "stored_bytes": stored,
+                "max_bytes": self.max_bytes,
+            }
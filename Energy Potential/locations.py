@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+
+# Spacing of the upstream forecast grid in degrees (0 keeps the raw coordinates)
+GRID_RESOLUTION = float(os.environ.get("OPEN_METEO_GRID_RESOLUTION", "0.1"))
+
+
+def snap_to_grid(lat, lon, resolution=GRID_RESOLUTION):
+    """
+    Centre of the grid cell a coordinate falls in
+
+    Open-Meteo answers with the nearest cell of its model grid, so every
+    coordinate inside a cell gets (nearly) the same forecast. Snapping makes
+    those requests identical, so they share fetches and cache entries.
+
+    Parameters:
+    lat (float): Latitude
+    lon (float): Longitude
+    resolution (float): Cell size in degrees; 0 or None returns the coordinate unchanged
+
+    Returns:
+    tuple: (lat, lon) of the cell centre, rounded to 6 decimals so equal cells compare equal
+    """
+    if not resolution:
+        return float(lat), float(lon)
+    # Round before flooring so coordinates on a cell edge (13.1 / 0.1) land in the upper cell
+    cell_lat = (np.floor(round(lat / resolution, 9)) + 0.5) * resolution
+    cell_lon = (np.floor(round(lon / resolution, 9)) + 0.5) * resolution
+    return round(float(cell_lat), 6), round(float(cell_lon), 6)
+
+
+def unique_cells(locations, resolution=GRID_RESOLUTION):
+    """
+    Snap locations to the grid and drop duplicate cells
+
+    Parameters:
+    locations (list): (lat, lon) pairs
+    resolution (float): Cell size in degrees (see snap_to_grid)
+
+    Returns:
+    tuple: (list of distinct (lat, lon) cells in first-seen order,
+            int64 array giving each location's index into the cells)
+    """
+    cells = []
+    positions = {}
+    index = np.empty(len(locations), dtype=np.int64)
+    for i, (lat, lon) in enumerate(locations):
+        cell = snap_to_grid(lat, lon, resolution)
+        if cell not in positions:
+            positions[cell] = len(cells)
+            cells.append(cell)
+        index[i] = positions[cell]
+    return cells, index
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.base import clone
+from sklearn.inspection import permutation_importance
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
@@ -10,9 +12,16 @@ import json
 from datetime import datetime, timedelta
 import pickle
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
 import openmeteo_requests
 import requests_cache
 from retry_requests import retry
+from weather_download import HISTORICAL_URL, HOURLY_VARIABLES, HistoricalWeatherDownloader, make_session
+from weather_archive import WeatherArchive
+from features import FeatureBuilder
+from tree_engine import compile_model, compiled_path
+from model_loader import ENERGY_TYPES, LazyPart, shared_loader
 
 # Define the 8 Tamil Nadu districts with their coordinates
 districts = {
@@ -35,32 +44,73 @@ districts = {
 # }
 
 
-# Function to fetch weather data from Open-Meteo API
-def fetch_weather_data(lat, lon, start_date, end_date):
-    url = f"https://historical-forecast-api.open-meteo.com/v1/forecast"
 
+# Estimator backends that can be chosen per energy type
+ESTIMATOR_BACKENDS = {
+    "random_forest": lambda n_jobs: RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs),
+    # Shallower trees on bootstrap subsamples: much faster to fit and predict, and far smaller
+    "random_forest_limited": lambda n_jobs: RandomForestRegressor(
+        n_estimators=100, max_depth=16, max_samples=0.3, min_samples_leaf=2, random_state=42, n_jobs=n_jobs
+    ),
+    "gradient_boosting": lambda n_jobs: GradientBoostingRegressor(n_estimators=100, random_state=42),
+    # Bins features into histograms; fits in a fraction of the time on large data
+    "hist_gradient_boosting": lambda n_jobs: HistGradientBoostingRegressor(max_iter=200, random_state=42),
+}
+
+# Backends whose trees are built one after another and can't use more than one core
+SEQUENTIAL_BACKENDS = {"gradient_boosting"}
+
+DEFAULT_ESTIMATORS = {"wind": "random_forest", "solar": "gradient_boosting", "ocean": "random_forest"}
+
+
+def make_estimator(spec, n_jobs=None):
+    """
+    Build an unfitted estimator
+
+    spec is a backend name from ESTIMATOR_BACKENDS, a (name, params) pair to
+    override the backend's parameters, or an estimator instance to clone.
+    """
+    if isinstance(spec, str):
+        return ESTIMATOR_BACKENDS[spec](n_jobs)
+    if isinstance(spec, tuple):
+        name, params = spec
+        return ESTIMATOR_BACKENDS[name](n_jobs).set_params(**params)
+    return clone(spec)
+
+
+def is_sequential(spec):
+    """Whether an estimator spec builds its trees one after another on a single core"""
+    if isinstance(spec, tuple):
+        spec = spec[0]
+    if isinstance(spec, str):
+        return spec in SEQUENTIAL_BACKENDS
+    return isinstance(spec, GradientBoostingRegressor)
+
+
+def feature_importances(model, X_test, y_test, max_rows=2000):
+    """Impurity importances where the model has them, permutation importances otherwise"""
+    if hasattr(model, "feature_importances_"):
+        return model.feature_importances_
+    n = min(max_rows, len(X_test))
+    result = permutation_importance(model, X_test[:n], y_test[:n], n_repeats=3, random_state=42)
+    return result.importances_mean
+
+
+# Pooled session with retries, shared by every fetch_weather_data call
+session = make_session()
+
+# Local weather history; only hours missing from it are downloaded
+archive = WeatherArchive()
+
+def _fetch_hourly(lat, lon, range_params):
     params = {
         "latitude": lat,
         "longitude": lon,
-        "start_date": start_date,
-        "end_date": end_date,
-        "hourly": [
-            "temperature_2m",
-            "relative_humidity_2m",
-            "wind_speed_10m",
-            "wind_speed_80m",
-            "wind_speed_120m",
-            "wind_direction_10m",
-            "wind_direction_80m",
-            "wind_direction_120m",
-            "wind_gusts_10m",
-            "cloud_cover",
-            "surface_pressure",
-            "vapour_pressure_deficit",
-        ],
+        "hourly": HOURLY_VARIABLES,
+        **range_params,
     }
 
-    response = requests.get(url, params=params)
+    response = session.get(HISTORICAL_URL, params=params)
     data = response.json()
 
     if "hourly" in data:
@@ -71,6 +121,21 @@ def fetch_weather_data(lat, lon, start_date, end_date):
         print(f"Error fetching data: {data}")
         return None
 
+# Function to fetch weather data from Open-Meteo API
+def fetch_weather_data(lat, lon, start_date, end_date, archive=archive):
+    if archive is None:
+        return _fetch_hourly(lat, lon, {"start_date": start_date, "end_date": end_date})
+
+    # Only request the hours the archive doesn't have yet
+    for first, last in archive.missing_ranges(lat, lon, start_date, end_date):
+        df = _fetch_hourly(lat, lon, {"start_hour": first.strftime("%Y-%m-%dT%H:%M"),
+                                      "end_hour": last.strftime("%Y-%m-%dT%H:%M")})
+        if df is None:
+            return None
+        archive.write(lat, lon, df)
+
+    return archive.read(lat, lon, start_date, end_date)
+
 
 # Define date range for data (3 months of historical data)
 end_date = datetime.now().strftime("%Y-%m-%d")
@@ -135,100 +200,56 @@ def generate_synthetic_data(district_info):
 
 # Create models for each energy type
 class RenewableEnergyModels:
-    def __init__(self):
-        self.wind_model = None
-        self.solar_model = None
-        self.ocean_model = None
-        self.wind_scaler = StandardScaler()
-        self.solar_scaler = StandardScaler()
-        self.ocean_scaler = StandardScaler()
+    # Trained in place, or read from the loader's directory on first use
+    wind_model = LazyPart("wind", "model")
+    wind_scaler = LazyPart("wind", "scaler")
+    wind_compiled = LazyPart("wind", "compiled")  # Compiled with the scaler folded in (see tree_engine)
+    solar_model = LazyPart("solar", "model")
+    solar_scaler = LazyPart("solar", "scaler")
+    solar_compiled = LazyPart("solar", "compiled")
+    ocean_model = LazyPart("ocean", "model")
+    ocean_scaler = LazyPart("ocean", "scaler")
+    ocean_compiled = LazyPart("ocean", "compiled")
+
+    def __init__(self, estimators=None, model_dir=None):
+        # Estimator backend per energy type (see ESTIMATOR_BACKENDS)
+        self.estimators = {**DEFAULT_ESTIMATORS, **(estimators or {})}
+        self.feature_builder = FeatureBuilder()
+        # Saved models are loaded lazily; otherwise start untrained
+        self.loader = shared_loader(model_dir) if model_dir else None
+        if self.loader is None:
+            self.wind_scaler = StandardScaler()
+            self.solar_scaler = StandardScaler()
+            self.ocean_scaler = StandardScaler()
+
+    def available(self, energy_type):
+        """Whether a model of this energy type is trained or saved"""
+        return (getattr(self, f"{energy_type}_compiled") is not None
+                or getattr(self, f"{energy_type}_model") is not None)
+
+    def prepare_features(self, df, energy_types=("wind", "solar", "ocean")):
+        """Prepare the features of several models in one pass over the weather data"""
+        return self.feature_builder.build(df, energy_types)
+
+    def predict_energy(self, energy_type, features):
+        """Predict one energy type, skipping the scaler when a compiled model is loaded"""
+        compiled = getattr(self, f"{energy_type}_compiled")
+        if compiled is not None:
+            return compiled.predict(features)
+        scaler = getattr(self, f"{energy_type}_scaler")
+        return getattr(self, f"{energy_type}_model").predict(scaler.transform(features))
 
     def prepare_wind_features(self, df):
         """Prepare features for wind energy prediction model"""
-        # Create a copy to avoid SettingWithCopyWarning
-        wind_features = df[
-            [
-                "wind_speed_10m",
-                "wind_speed_80m",
-                "wind_speed_120m",
-                "wind_gusts_10m",
-                "surface_pressure",
-                "hour",
-                "month",
-            ]
-        ].copy()  # Add .copy() here
-
-        # Calculate air density
-        R = 287.05
-        wind_features["temperature_kelvin"] = df["temperature_2m"] + 273.15
-        wind_features["air_density"] = (
-            df["surface_pressure"] * 100 / (R * wind_features["temperature_kelvin"])
-        )
-
-        return wind_features
+        return self.prepare_features(df, ("wind",))["wind"]
 
     def prepare_solar_features(self, df):
         """Prepare features for solar energy prediction model"""
-        solar_features = df[
-            ["temperature_2m", "cloud_cover", "hour", "month", "day_of_year"]
-        ].copy()
-
-        # Extract latitude from DataFrame (constant for all rows)
-        latitude = df["latitude"].iloc[0]  # Works because all rows have the same latitude
-
-        # Calculate solar declination (seasonal variation)
-        declination = np.radians(23.45) * np.sin(2 * np.pi * (df["day_of_year"] - 81) / 365)
-
-        # Hour angle (15° per hour from solar noon)
-        hour_angle = np.radians(15 * (df["hour"] - 12))
-
-        # Solar zenith angle formula
-        solar_zenith = np.arccos(
-            np.sin(np.radians(latitude)) * np.sin(declination) +
-            np.cos(np.radians(latitude)) * np.cos(declination) * np.cos(hour_angle)
-        )
-
-        solar_features["solar_zenith"] = np.degrees(solar_zenith)
-
-        # Calculate irradiance
-        solar_constant = 1361  # W/m²
-        solar_features["clearsky_irradiance"] = solar_constant * np.cos(solar_zenith)
-        solar_features["clearsky_irradiance"] = solar_features["clearsky_irradiance"].clip(0, None)
-
-        # Apply cloud attenuation
-        solar_features["estimated_irradiance"] = solar_features["clearsky_irradiance"] * (
-            1 - df["cloud_cover"] / 100 * 0.75
-        )
-
-        return solar_features
+        return self.prepare_features(df, ("solar",))["solar"]
 
     def prepare_ocean_features(self, df):
         """Prepare features for ocean energy prediction model"""
-        # Key ocean features - simplified as we don't have actual ocean data
-        ocean_features = df[
-            [
-                "wind_speed_10m",
-                "wind_gusts_10m",
-                "surface_pressure",
-                "wind_direction_10m",
-                "hour",
-                "month",
-            ]
-        ]
-
-        # Calculate simplified wave height (using relationship between wind speed and wave height)
-        # This is a very rough approximation
-        ocean_features["estimated_wave_height"] = (
-            0.0015 * df["wind_speed_10m"] ** 2 * np.log(df["wind_gusts_10m"])
-        )
-
-        # Calculate simplified tide height based on lunar cycle (extremely simplified)
-        ocean_features["day_in_lunar_cycle"] = (df["day_of_year"] % 29.53).astype(int)
-        ocean_features["tide_factor"] = np.sin(
-            2 * np.pi * ocean_features["day_in_lunar_cycle"] / 29.53
-        )
-
-        return ocean_features
+        return self.prepare_features(df, ("ocean",))["ocean"]
 
     def generate_target_values(self, features, energy_type):
         """Generate synthetic target values based on features"""
@@ -258,8 +279,8 @@ class RenewableEnergyModels:
             energy = energy * (0.7 + 0.6 * np.random.random(len(energy)))
             return energy/10
 
-    def train_wind_model(self, districts_data):
-        """Train wind energy prediction model"""
+    def train_wind_model(self, districts_data, n_jobs=None):
+        """Train wind energy prediction model (n_jobs cores build a forest's trees)"""
         all_features = []
         all_targets = []
 
@@ -288,7 +309,8 @@ class RenewableEnergyModels:
         )
 
         # Train model
-        self.wind_model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.wind_model = make_estimator(self.estimators["wind"], n_jobs)
+        self.wind_compiled = None  # A saved compiled copy is of the previous model
         self.wind_model.fit(X_train, y_train)
 
         # Evaluate
@@ -300,7 +322,7 @@ class RenewableEnergyModels:
 
         # Feature importance
         feature_importance = pd.DataFrame(
-            {"Feature": X.columns, "Importance": self.wind_model.feature_importances_}
+            {"Feature": X.columns, "Importance": feature_importances(self.wind_model, X_test, y_test)}
         ).sort_values("Importance", ascending=False)
 
         print("Wind Energy - Top Features:")
@@ -308,7 +330,7 @@ class RenewableEnergyModels:
 
         return mse, r2, feature_importance
 
-    def train_solar_model(self, districts_data):
+    def train_solar_model(self, districts_data, n_jobs=None):
         """Train solar energy prediction model"""
         all_features = []
         all_targets = []
@@ -332,7 +354,8 @@ class RenewableEnergyModels:
         )
 
         # Train model
-        self.solar_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
+        self.solar_model = make_estimator(self.estimators["solar"], n_jobs)
+        self.solar_compiled = None  # A saved compiled copy is of the previous model
         self.solar_model.fit(X_train, y_train)
 
         # Evaluate
@@ -344,7 +367,7 @@ class RenewableEnergyModels:
 
         # Feature importance
         feature_importance = pd.DataFrame(
-            {"Feature": X.columns, "Importance": self.solar_model.feature_importances_}
+            {"Feature": X.columns, "Importance": feature_importances(self.solar_model, X_test, y_test)}
         ).sort_values("Importance", ascending=False)
 
         print("Solar Energy - Top Features:")
@@ -352,7 +375,7 @@ class RenewableEnergyModels:
 
         return mse, r2, feature_importance
 
-    def train_ocean_model(self, districts_data):
+    def train_ocean_model(self, districts_data, n_jobs=None):
         """Train ocean energy prediction model (only for coastal districts)"""
         all_features = []
         all_targets = []
@@ -384,7 +407,8 @@ class RenewableEnergyModels:
         )
 
         # Train model
-        self.ocean_model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.ocean_model = make_estimator(self.estimators["ocean"], n_jobs)
+        self.ocean_compiled = None  # A saved compiled copy is of the previous model
         self.ocean_model.fit(X_train, y_train)
 
         # Evaluate
@@ -396,7 +420,7 @@ class RenewableEnergyModels:
 
         # Feature importance
         feature_importance = pd.DataFrame(
-            {"Feature": X.columns, "Importance": self.ocean_model.feature_importances_}
+            {"Feature": X.columns, "Importance": feature_importances(self.ocean_model, X_test, y_test)}
         ).sort_values("Importance", ascending=False)
 
         print("Ocean Energy - Top Features:")
@@ -406,26 +430,27 @@ class RenewableEnergyModels:
 
     def predict_district_potential(self, district_name, district_data):
         """Predict energy potential for a district"""
-        # Prepare features
-        wind_features = self.prepare_wind_features(district_data)
-        solar_features = self.prepare_solar_features(district_data)
+        # Ocean energy is only predicted for coastal districts
+        district_info = next(
+            (v for k, v in districts.items() if k == district_name), None
+        )
+        coastal = district_info and district_info["coastal"] and self.available("ocean")
 
-        # Scale features
-        wind_features_scaled = self.wind_scaler.transform(wind_features)
-        solar_features_scaled = self.solar_scaler.transform(solar_features)
+        # Forecast data doesn't carry the latitude the solar features need
+        if "latitude" not in district_data and district_info:
+            district_data["latitude"] = district_info["lat"]
+
+        # Prepare the features of every model in one pass
+        features = self.prepare_features(
+            district_data, ("wind", "solar", "ocean") if coastal else ("wind", "solar")
+        )
 
         # Predict
-        wind_predictions = self.wind_model.predict(wind_features_scaled)
-        solar_predictions = self.solar_model.predict(solar_features_scaled)
+        wind_predictions = self.predict_energy("wind", features["wind"])
+        solar_predictions = self.predict_energy("solar", features["solar"])
 
-        # For ocean energy, only predict if coastal
-        district_info = next(
-            (v for k, v in districts.items() if k == district_name), None
-        )
-        if district_info and district_info["coastal"] and self.ocean_model is not None:
-            ocean_features = self.prepare_ocean_features(district_data)
-            ocean_features_scaled = self.ocean_scaler.transform(ocean_features)
-            ocean_predictions = self.ocean_model.predict(ocean_features_scaled)
+        if coastal:
+            ocean_predictions = self.predict_energy("ocean", features["ocean"])
         else:
             ocean_predictions = np.zeros(len(district_data))
 
@@ -488,53 +513,128 @@ class RenewableEnergyModels:
                 pickle.dump(self.ocean_scaler, f)
             print(f"Ocean model and scaler saved to {directory}")
 
+        # Save array-compiled copies with the scaler folded in; they load memory-mapped
+        # and predict on unscaled features without sklearn
+        for energy_type in ("wind", "solar", "ocean"):
+            model = getattr(self, f"{energy_type}_model")
+            if model is None:
+                continue
+            try:
+                compile_model(model, getattr(self, f"{energy_type}_scaler")).save(compiled_path(directory, energy_type))
+            except (TypeError, ValueError) as e:
+                print(f"Skipping compiled {energy_type} model: {e}")
+
+        # Loaders of this directory reload the new files on next use
+        shared_loader(directory).clear()
+
     @classmethod
-    def load_models(cls, directory="saved_models"):
-        """Load trained models and scalers from disk"""
-        models = cls()
-
-        # Load wind model and scaler
-        try:
-            with open(f"{directory}/wind_model.pkl", "rb") as f:
-                models.wind_model = pickle.load(f)
-            with open(f"{directory}/wind_scaler.pkl", "rb") as f:
-                models.wind_scaler = pickle.load(f)
-            print("Wind model and scaler loaded successfully")
-        except FileNotFoundError:
-            print("Wind model files not found")
-
-        # Load solar model and scaler
-        try:
-            with open(f"{directory}/solar_model.pkl", "rb") as f:
-                models.solar_model = pickle.load(f)
-            with open(f"{directory}/solar_scaler.pkl", "rb") as f:
-                models.solar_scaler = pickle.load(f)
-            print("Solar model and scaler loaded successfully")
-        except FileNotFoundError:
-            print("Solar model files not found")
-
-        # Load ocean model and scaler
-        try:
-            with open(f"{directory}/ocean_model.pkl", "rb") as f:
-                models.ocean_model = pickle.load(f)
-            with open(f"{directory}/ocean_scaler.pkl", "rb") as f:
-                models.ocean_scaler = pickle.load(f)
-            print("Ocean model and scaler loaded successfully")
-        except FileNotFoundError:
-            print("Ocean model files not found")
+    def load_models(cls, directory="saved_models", prefetch=False):
+        """Load trained models and scalers from disk, each energy type on first use"""
+        models = cls(model_dir=directory)
+
+        for energy_type in ENERGY_TYPES:
+            if not models.loader.available(energy_type):
+                print(f"{energy_type.capitalize()} model files not found")
 
+        if prefetch:
+            models.loader.prefetch()
         return models
 
 
+def split_cpu_budget(districts_data, cpu_budget, estimators=DEFAULT_ESTIMATORS):
+    """
+    Split a number of cores between the three models
+
+    Sequential backends such as gradient boosting build their trees one after
+    another and get a single core; the rest is shared by the other models in
+    proportion to the rows each is trained on.
+    """
+    coastal_rows = sum(len(df) for name, df in districts_data.items() if districts.get(name, {}).get("coastal"))
+    total_rows = sum(len(df) for df in districts_data.values())
+    rows = {"wind": total_rows, "solar": total_rows, "ocean": coastal_rows}
+
+    n_jobs = {energy_type: 1 for energy_type in rows}
+    parallel = [t for t in rows if not is_sequential(estimators[t]) and rows[t]]
+    spare = max(len(parallel), cpu_budget - (len(rows) - len(parallel)))
+    parallel_rows = sum(rows[t] for t in parallel)
+    for energy_type in parallel:
+        n_jobs[energy_type] = max(1, int(spare * rows[energy_type] / parallel_rows))
+    if parallel:
+        # Cores lost to rounding go to the model with the most data
+        largest = max(parallel, key=lambda t: rows[t])
+        n_jobs[largest] += max(0, spare - sum(n_jobs[t] for t in parallel))
+    return n_jobs
+
+
+def _train_one(energy_type, districts_data, n_jobs, estimators):
+    """Worker: fit one model and return it with its fitted scaler and metrics"""
+    models = RenewableEnergyModels(estimators)
+    # Histogram gradient boosting threads through OpenMP rather than n_jobs
+    with threadpool_limits(limits=n_jobs):
+        metrics = getattr(models, f"train_{energy_type}_model")(districts_data, n_jobs=n_jobs)
+    return (getattr(models, f"{energy_type}_model"), getattr(models, f"{energy_type}_scaler"), metrics)
+
+
+def train_all_models(models, districts_data, cpu_budget=None):
+    """
+    Fit the wind, solar and ocean models concurrently in a process pool
+
+    Parameters:
+    models (RenewableEnergyModels): Receives the fitted models and scalers
+    districts_data (dict): District name mapped to its cleaned weather data
+    cpu_budget (int): Cores to use in total (all cores by default)
+
+    Returns:
+    dict: Energy type mapped to the (mse, r2, feature importance) of its model
+    """
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    n_jobs = split_cpu_budget(districts_data, cpu_budget, models.estimators)
+
+    # The ocean model only ever sees coastal districts, so don't ship the others to it
+    jobs = {
+        "wind": districts_data,
+        "solar": districts_data,
+        "ocean": {name: df for name, df in districts_data.items() if districts.get(name, {}).get("coastal")},
+    }
+
+    results = {}
+    if cpu_budget < 2:
+        # Nothing to run in parallel; train in this process
+        for energy_type, data in jobs.items():
+            print(f"\nTraining {energy_type.capitalize()} Energy Model...")
+            results[energy_type] = _train_one(energy_type, data, 1, models.estimators)
+    else:
+        print(f"\nTraining all models in parallel on {cpu_budget} cores "
+              f"(wind: {n_jobs['wind']}, solar: {n_jobs['solar']}, ocean: {n_jobs['ocean']})")
+        with ProcessPoolExecutor(max_workers=min(len(jobs), cpu_budget)) as executor:
+            futures = {executor.submit(_train_one, energy_type, data, n_jobs[energy_type], models.estimators): energy_type
+                       for energy_type, data in jobs.items()}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+
+    metrics = {}
+    for energy_type, (model, scaler, model_metrics) in results.items():
+        setattr(models, f"{energy_type}_model", model)
+        setattr(models, f"{energy_type}_scaler", scaler)
+        setattr(models, f"{energy_type}_compiled", None)
+        metrics[energy_type] = model_metrics
+    return metrics
+
+
 def main():
     # Fetch real weather data for each district
     districts_data = {}
     start_date="2024-05-03"
     end_date="2025-01-01"
-    # Loop through districts first
+    # Download every district's history concurrently in monthly chunks; only days
+    # missing from the local archive are fetched, so retraining on a growing
+    # history downloads just the new days and an interrupted run resumes
+    print("Fetching data for all districts...")
+    downloader = HistoricalWeatherDownloader(archive=archive)
+    raw_data = downloader.download(districts, start_date, end_date)
+
     for name, info in districts.items():  # ✅ info is defined here
-        print(f"Fetching data for {name}...")
-        df = fetch_weather_data(info['lat'], info['lon'], start_date, end_date)
+        df = raw_data[name]
 
         if df is not None:
             # Add datetime features and latitude
@@ -571,15 +671,7 @@ def main():
     # Train models
     print("\nTraining renewable energy models...")
     models = RenewableEnergyModels()
-    
-    print("\nTraining Wind Energy Model...")
-    models.train_wind_model(districts_data)
-    
-    print("\nTraining Solar Energy Model...")
-    models.train_solar_model(districts_data)
-    
-    print("\nTraining Ocean Energy Model...")
-    models.train_ocean_model(districts_data)
+    train_all_models(models, districts_data)
 
     # Save models
     print("\nSaving trained models to disk...")
@@ -0,0 +1,182 @@
+import os
+import pickle
+import hashlib
+import threading
+
+from features import FEATURE_COLUMNS
+from tree_engine import CompiledEnsemble, compiled_path
+
+ENERGY_TYPES = ("wind", "solar", "ocean")
+
+# One loader per model directory in this process (see shared_loader)
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+class ModelLoader:
+    """
+    Load each energy type's model, scaler and compiled copy on first use
+
+    Nothing is read from disk until a part is asked for, so a workload that
+    only forecasts inland districts never loads the ocean model. Each energy
+    type has its own lock: concurrent callers load a part exactly once, and
+    different energy types can load at the same time.
+    """
+
+    def __init__(self, model_dir="saved_models"):
+        self.model_dir = model_dir
+        self._parts = {}
+        self._locks = {energy_type: threading.Lock() for energy_type in ENERGY_TYPES}
+        self._version = None
+
+    def _paths(self, energy_type):
+        return {
+            "model": os.path.join(self.model_dir, f"{energy_type}_model.pkl"),
+            "scaler": os.path.join(self.model_dir, f"{energy_type}_scaler.pkl"),
+            "compiled": compiled_path(self.model_dir, energy_type),
+        }
+
+    def available(self, energy_type):
+        """Whether a model of this energy type was saved, without loading it"""
+        paths = self._paths(energy_type)
+        return os.path.exists(paths["model"]) or os.path.exists(paths["compiled"])
+
+    def get(self, energy_type, part):
+        """
+        Return one part of an energy type's saved model, loading it on first use
+
+        Parameters:
+        energy_type (str): "wind", "solar" or "ocean"
+        part (str): "model", "scaler" or "compiled"
+
+        Returns:
+        The loaded object, or None if it wasn't saved or failed to load
+        """
+        key = (energy_type, part)
+        if key in self._parts:
+            return self._parts[key]
+        with self._locks[energy_type]:
+            # Another thread may have loaded it while this one waited
+            if key not in self._parts:
+                self._parts[key] = self._load(self._paths(energy_type)[part], part)
+        return self._parts[key]
+
+    def _load(self, path, part):
+        if part == "compiled":
+            if not os.path.exists(path):
+                return None
+            try:
+                compiled = CompiledEnsemble.load(path)
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                return None
+            # Only compiled copies with the scaler folded in can replace scaler + model
+            return compiled if compiled.meta.get("scaler_folded") else None
+
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
+
+    def version(self):
+        """
+        Fingerprint of the saved model files (names, sizes and modification times)
+
+        Saving new models changes it, so results computed with older models
+        can be told apart. It doesn't depend on how the directory is spelled,
+        so processes started from different working directories agree.
+        Computed once until clear().
+        """
+        if self._version is None:
+            digest = hashlib.blake2b(digest_size=8)
+            for energy_type in ENERGY_TYPES:
+                for path in self._paths(energy_type).values():
+                    if os.path.exists(path):
+                        stat = os.stat(path)
+                        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+            self._version = digest.hexdigest()
+        return self._version
+
+    def clear(self):
+        """Forget everything loaded so far, e.g. after the models were saved again"""
+        self._version = None
+        for energy_type in ENERGY_TYPES:
+            with self._locks[energy_type]:
+                for part in ("model", "scaler", "compiled"):
+                    self._parts.pop((energy_type, part), None)
+
+    def load_for_prediction(self, energy_type):
+        """Load what predicting needs: the compiled copy, or the scaler and model if there is none"""
+        if self.get(energy_type, "compiled") is None:
+            self.get(energy_type, "scaler")
+            self.get(energy_type, "model")
+
+    def feature_names(self, energy_type):
+        """Feature order the saved model expects"""
+        compiled = self.get(energy_type, "compiled")
+        if compiled is not None and compiled.feature_names:
+            return list(compiled.feature_names)
+        names = getattr(self.get(energy_type, "scaler"), "feature_names_in_", None)
+        return list(names) if names is not None else list(FEATURE_COLUMNS[energy_type])
+
+    def prefetch(self, energy_types=ENERGY_TYPES):
+        """
+        Load the given energy types in a background thread
+
+        Returns:
+        threading.Thread: The (daemon) loading thread
+        """
+        def load():
+            for energy_type in energy_types:
+                if self.available(energy_type):
+                    self.load_for_prediction(energy_type)
+
+        thread = threading.Thread(target=load, name="model-prefetch", daemon=True)
+        thread.start()
+        return thread
+
+
+def shared_loader(model_dir="saved_models"):
+    """
+    The process-wide loader of a model directory
+
+    Every session, forecaster and thread asking for the same directory gets
+    the same loader, so each model is loaded (mapped) once per process.
+    """
+    key = os.path.abspath(model_dir)
+    with _loaders_lock:
+        if key not in _loaders:
+            _loaders[key] = ModelLoader(model_dir)
+        return _loaders[key]
+
+
+class LazyPart:
+    """
+    Attribute such as wind_model that reads through the owner's loader
+
+    A value assigned to the attribute (e.g. a freshly trained model) takes
+    precedence; otherwise the saved part is loaded on first read, or None
+    if the owner has no loader.
+    """
+
+    def __init__(self, energy_type, part):
+        self.energy_type = energy_type
+        self.part = part
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.name in obj.__dict__:
+            return obj.__dict__[self.name]
+        loader = obj.__dict__.get("loader")
+        return loader.get(self.energy_type, self.part) if loader is not None else None
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
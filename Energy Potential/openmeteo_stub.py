@@ -0,0 +1,428 @@
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+import requests
+import flatbuffers
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from weather_download import variable_code
+
+UPSTREAM_HISTORICAL_URL = "https://historical-forecast-api.open-meteo.com/v1/forecast"
+UPSTREAM_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Parameters that select the time range of a request
+TIME_PARAMS = ["start_date", "end_date", "start_hour", "end_hour", "forecast_days", "past_days", "timezone"]
+HISTORICAL_PARAMS = {"start_date", "end_date", "start_hour", "end_hour"}
+
+
+class LocationData:
+    """Hourly series of one location: epoch seconds plus one float32 array per variable"""
+
+    def __init__(self, lat, lon, utc_offset, times, values):
+        self.lat = lat
+        self.lon = lon
+        self.utc_offset = utc_offset
+        self.times = np.asarray(times, dtype=np.int64)
+        self.values = values
+
+    def to_payload(self):
+        """Open-Meteo style JSON with unix timestamps, as stored in recordings"""
+        hourly = {"time": self.times.tolist()}
+        for name, values in self.values.items():
+            hourly[name] = [None if np.isnan(v) else float(v) for v in values]
+        return {"latitude": self.lat, "longitude": self.lon,
+                "utc_offset_seconds": self.utc_offset, "hourly": hourly}
+
+    @classmethod
+    def from_payload(cls, payload):
+        hourly = payload["hourly"]
+        values = {name: np.array([np.nan if v is None else v for v in column], dtype=np.float32)
+                  for name, column in hourly.items() if name != "time"}
+        return cls(payload["latitude"], payload["longitude"], payload.get("utc_offset_seconds", 0),
+                   hourly["time"], values)
+
+
+def _noise(seed, hours, k):
+    """Deterministic noise in [-1, 1) that only depends on the location, the hour and the variable"""
+    x = np.sin(hours * 12.9898 + seed * 78.233 + k * 37.719) * 43758.5453
+    return 2 * (x - np.floor(x)) - 1
+
+
+def synthetic_weather(lat, lon, times, variables, utc_offset=0):
+    """
+    Plausible hourly weather for a location
+
+    The same location and hour always produce the same values, so overlapping
+    requests agree with each other the way real archived data does.
+
+    Parameters:
+    times (numpy.ndarray): Epoch seconds (UTC)
+    variables (list): Open-Meteo hourly variable names
+
+    Returns:
+    dict: Variable name mapped to a float32 array
+    """
+    seed = int(hashlib.md5(f"{lat:.4f},{lon:.4f}".encode()).hexdigest()[:6], 16) % 1000
+    hours = np.asarray(times, dtype=np.int64) // 3600
+    local_hour = (hours + utc_offset // 3600) % 24
+    day_of_year = (hours // 24) % 365
+
+    daily = np.sin(2 * np.pi * (local_hour - 9) / 24)
+    seasonal = np.sin(2 * np.pi * (day_of_year - 80) / 365)
+    # Slowly varying weather systems on top of the daily and seasonal cycles
+    synoptic = np.sin(2 * np.pi * hours / (24 * 5.3) + seed)
+
+    wind_10m = np.clip(9 + 3 * seasonal + 4 * synoptic + 2 * daily + 3 * _noise(seed, hours, 1), 0.5, None)
+    cloud_cover = np.clip(45 - 30 * seasonal * synoptic + 35 * _noise(seed, hours, 2), 0, 100)
+
+    fields = {
+        "temperature_2m": 28 - abs(lat - 15) * 0.3 + 4 * daily + 3 * seasonal + 1.5 * _noise(seed, hours, 0),
+        "relative_humidity_2m": np.clip(68 - 15 * daily + 8 * synoptic + 10 * _noise(seed, hours, 3), 10, 100),
+        "wind_speed_10m": wind_10m,
+        "wind_speed_80m": wind_10m * 1.35,
+        "wind_speed_120m": wind_10m * 1.5,
+        "wind_direction_10m": (210 + 50 * synoptic + 40 * _noise(seed, hours, 4)) % 360,
+        "wind_direction_80m": (215 + 50 * synoptic + 35 * _noise(seed, hours, 5)) % 360,
+        "wind_direction_120m": (220 + 50 * synoptic + 30 * _noise(seed, hours, 6)) % 360,
+        "wind_gusts_10m": wind_10m * 1.6 + 3 * np.abs(_noise(seed, hours, 7)),
+        "cloud_cover": cloud_cover,
+        "surface_pressure": 1008 - 4 * seasonal - 3 * synoptic + _noise(seed, hours, 8),
+        "vapour_pressure_deficit": np.clip(1.4 + 0.9 * daily - 0.4 * synoptic + 0.3 * _noise(seed, hours, 9), 0.05, None),
+    }
+
+    values = {}
+    for k, name in enumerate(variables):
+        series = fields[name] if name in fields else 10 + 10 * _noise(seed, hours, 100 + k)
+        values[name] = np.asarray(series, dtype=np.float32)
+    return values
+
+
+def _utc_offset(params, lon):
+    """'auto' picks a half-hour offset from the longitude; everything else is treated as GMT"""
+    if params.get("timezone", "GMT") == "auto":
+        return int(round(lon / 7.5)) * 1800
+    return 0
+
+
+def resolve_times(params, utc_offset, now=None):
+    """
+    Hourly epoch seconds covered by a request
+
+    start_hour/end_hour and start_date/end_date are inclusive local times;
+    otherwise the range is past_days before to forecast_days after local midnight.
+    """
+    offset = timedelta(seconds=utc_offset)
+    if "start_hour" in params and "end_hour" in params:
+        start = datetime.fromisoformat(params["start_hour"])
+        end = datetime.fromisoformat(params["end_hour"]) + timedelta(hours=1)
+    elif "start_date" in params and "end_date" in params:
+        start = datetime.fromisoformat(params["start_date"])
+        end = datetime.fromisoformat(params["end_date"]) + timedelta(days=1)
+    else:
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        midnight = (now + offset).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = midnight - timedelta(days=int(params.get("past_days", 0)))
+        end = midnight + timedelta(days=int(params.get("forecast_days", 7)))
+
+    if end <= start:
+        raise ValueError("End of the time range must not be before its start")
+    epoch = datetime(1970, 1, 1)
+    first = int((start - offset - epoch).total_seconds())
+    last = int((end - offset - epoch).total_seconds())
+    return np.arange(first, last, 3600, dtype=np.int64)
+
+
+def encode_flatbuffers(locations, variables):
+    """
+    Encode locations as size-prefixed WeatherApiResponse messages, one after another
+
+    This is the wire format openmeteo_requests reads for format=flatbuffers.
+    """
+    messages = []
+    for location in locations:
+        builder = flatbuffers.Builder(1024 + 4 * len(location.times) * len(variables))
+
+        variable_tables = []
+        for name in variables:
+            values = builder.CreateNumpyVector(np.ascontiguousarray(location.values[name], dtype=np.float32))
+            code, altitude = variable_code(name)
+            builder.StartObject(13)
+            builder.PrependUint8Slot(0, code, 0)
+            builder.PrependUOffsetTRelativeSlot(3, values, 0)
+            builder.PrependInt16Slot(5, altitude, 0)
+            variable_tables.append(builder.EndObject())
+
+        builder.StartVector(4, len(variable_tables), 4)
+        for table in reversed(variable_tables):
+            builder.PrependUOffsetTRelative(table)
+        variables_vector = builder.EndVector()
+
+        builder.StartObject(4)
+        builder.PrependInt64Slot(0, int(location.times[0]), 0)
+        builder.PrependInt64Slot(1, int(location.times[-1]) + 3600, 0)
+        builder.PrependInt32Slot(2, 3600, 0)
+        builder.PrependUOffsetTRelativeSlot(3, variables_vector, 0)
+        hourly = builder.EndObject()
+
+        timezone_name = builder.CreateString("GMT" if location.utc_offset == 0 else "auto")
+        builder.StartObject(16)
+        builder.PrependFloat32Slot(0, location.lat, 0.0)
+        builder.PrependFloat32Slot(1, location.lon, 0.0)
+        builder.PrependInt32Slot(6, location.utc_offset, 0)
+        builder.PrependUOffsetTRelativeSlot(7, timezone_name, 0)
+        builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+        builder.FinishSizePrefixed(builder.EndObject())
+        messages.append(bytes(builder.Output()))
+    return b"".join(messages)
+
+
+def encode_json(locations, variables, timeformat="iso8601"):
+    """Encode locations the way the Open-Meteo JSON API does (a list for several locations)"""
+    payloads = []
+    for location in locations:
+        if timeformat == "unixtime":
+            times = location.times.tolist()
+        else:
+            local = pd.to_datetime(location.times + location.utc_offset, unit="s")
+            times = local.strftime("%Y-%m-%dT%H:%M").tolist()
+        hourly = {"time": times}
+        for name in variables:
+            hourly[name] = [None if np.isnan(v) else round(float(v), 2) for v in location.values[name]]
+        payloads.append({
+            "latitude": location.lat,
+            "longitude": location.lon,
+            "generationtime_ms": 0.1,
+            "utc_offset_seconds": location.utc_offset,
+            "timezone": "GMT" if location.utc_offset == 0 else "auto",
+            "hourly": hourly,
+        })
+    return json.dumps(payloads[0] if len(payloads) == 1 else payloads).encode()
+
+
+class RecordingStore:
+    """Upstream responses saved per location as JSON files keyed by the request"""
+
+    def __init__(self, directory="openmeteo_recordings"):
+        self.directory = directory
+
+    @staticmethod
+    def key(lat, lon, variables, params):
+        request = {"lat": round(lat, 4), "lon": round(lon, 4), "hourly": sorted(variables),
+                   **{name: params[name] for name in TIME_PARAMS if name in params}}
+        return hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return LocationData.from_payload(json.load(f))
+
+    def save(self, key, location):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(location.to_payload(), f)
+        os.replace(tmp_path, path)
+
+
+class OpenMeteoStub:
+    """
+    Answers Open-Meteo requests offline
+
+    Modes:
+    synthetic: generate deterministic data for every request
+    replay:    serve recordings only (or synthetic data when fallback is set)
+    record:    serve recordings, fetching and saving upstream responses on a miss
+    """
+
+    def __init__(self, mode="synthetic", store=None, fallback=False, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, fail_first=0, seed=0, upstream_timeout=60):
+        if mode not in ("synthetic", "replay", "record"):
+            raise ValueError(f"Unknown mode '{mode}'")
+        self.mode = mode
+        self.store = store or RecordingStore()
+        self.fallback = fallback
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.upstream_timeout = upstream_timeout
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "locations": 0, "injected_errors": 0,
+                      "replayed": 0, "recorded": 0, "synthesized": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def inject(self):
+        """Sleep for the configured latency; return an error status to send instead, if any"""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self.stats["requests"] <= self.fail_first or self._rng.random() < self.error_rate
+            if fail:
+                self.stats["injected_errors"] += 1
+        if delay > 0:
+            time.sleep(delay)
+        return self.error_status if fail else None
+
+    def _fetch_upstream(self, lat, lon, variables, params):
+        url = UPSTREAM_HISTORICAL_URL if HISTORICAL_PARAMS & set(params) else UPSTREAM_FORECAST_URL
+        upstream_params = {name: params[name] for name in TIME_PARAMS if name in params}
+        upstream_params.update({"latitude": lat, "longitude": lon,
+                                "hourly": ",".join(variables), "timeformat": "unixtime"})
+        response = requests.get(url, params=upstream_params, timeout=self.upstream_timeout)
+        response.raise_for_status()
+        return LocationData.from_payload(response.json())
+
+    def locations(self, params, variables):
+        """Hourly data for every latitude/longitude pair of a request"""
+        latitudes = [float(v) for v in params["latitude"].split(",")]
+        longitudes = [float(v) for v in params["longitude"].split(",")]
+        if len(latitudes) != len(longitudes):
+            raise ValueError("Parameter 'latitude' and 'longitude' must have the same number of elements")
+
+        results = []
+        for lat, lon in zip(latitudes, longitudes):
+            key = self.store.key(lat, lon, variables, params)
+            location = self.store.load(key) if self.mode != "synthetic" else None
+
+            if location is not None:
+                self._count("replayed")
+            elif self.mode == "record":
+                location = self._fetch_upstream(lat, lon, variables, params)
+                self.store.save(key, location)
+                self._count("recorded")
+            elif self.mode == "synthetic" or self.fallback:
+                utc_offset = _utc_offset(params, lon)
+                times = resolve_times(params, utc_offset)
+                location = LocationData(lat, lon, utc_offset, times,
+                                        synthetic_weather(lat, lon, times, variables, utc_offset))
+                self._count("synthesized")
+            else:
+                raise ValueError(f"No recording for latitude {lat}, longitude {lon}")
+
+            missing = [name for name in variables if name not in location.values]
+            if missing:
+                raise ValueError(f"Recording has no data for {missing}")
+            results.append(location)
+
+        self._count("locations", len(results))
+        return results
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, reason):
+        # Same body as the real API, which openmeteo_requests reads on 400/429
+        self._send(status, json.dumps({"error": True, "reason": reason}).encode(), "application/json")
+
+    def do_GET(self):
+        stub = self.server.stub
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") == "/stats":
+            return self._send(200, json.dumps(stub.stats).encode(), "application/json")
+
+        # Lists arrive either comma separated or as repeated parameters
+        params = {name: ",".join(values) for name, values in parse_qs(parsed.query).items()}
+        if "latitude" not in params or "longitude" not in params:
+            return self._send_error(400, "Parameter 'latitude' and 'longitude' are required")
+
+        status = stub.inject()
+        if status is not None:
+            return self._send_error(status, "Injected error")
+
+        variables = [name for name in params.get("hourly", "").split(",") if name]
+        try:
+            locations = stub.locations(params, variables)
+        except (ValueError, KeyError) as e:
+            return self._send_error(400, str(e))
+        except requests.RequestException as e:
+            return self._send_error(502, f"Upstream request failed: {e}")
+
+        if params.get("format") == "flatbuffers":
+            self._send(200, encode_flatbuffers(locations, variables), "application/octet-stream")
+        else:
+            self._send(200, encode_json(locations, variables, params.get("timeformat", "iso8601")),
+                       "application/json")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def create_stub_server(host="127.0.0.1", port=8060, **options):
+    """Build the stub HTTP server; options are passed to OpenMeteoStub"""
+    server = StubServer((host, port), StubRequestHandler)
+    server.stub = OpenMeteoStub(**options)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Open-Meteo APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8060)
+    parser.add_argument("--mode", choices=["synthetic", "replay", "record"], default="synthetic")
+    parser.add_argument("--recordings", default="openmeteo_recordings")
+    parser.add_argument("--fallback", action="store_true", help="Synthesize data for replay misses")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fail-first", type=int, default=0, help="Fail this many requests before any succeed")
+    args = parser.parse_args()
+
+    server = create_stub_server(
+        args.host, args.port,
+        mode=args.mode,
+        store=RecordingStore(args.recordings),
+        fallback=args.fallback,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        fail_first=args.fail_first,
+    )
+    url = f"http://{args.host}:{args.port}/v1/forecast"
+    print(f"Open-Meteo stub ({args.mode}) serving on {url}")
+    print(f"Point the clients at it with OPEN_METEO_HISTORICAL_URL={url} OPEN_METEO_FORECAST_URL={url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,136 +5,255 @@ from sklearn.preprocessing import StandardScaler
 import matplotlib.pyplot as plt
 import requests
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import os
 import pickle
 import openmeteo_requests
 import requests_cache
 from retry_requests import retry
+from weather_download import HOURLY_VARIABLES, variable_code
+from features import FeatureBuilder
+from model_loader import ENERGY_TYPES, LazyPart, shared_loader
+from forecast_cache import ForecastCache
+from http_cache import HttpCacheManager
+from locations import GRID_RESOLUTION, unique_cells
+from single_flight import SingleFlight
 
-cache_session = requests_cache.CachedSession('.cache', expire_after = 3600)
+# Bounded response cache that expires with the upstream forecast cycle; see http_cache.stats()
+http_cache = HttpCacheManager('.cache')
+cache_session = http_cache.session()
 retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
 openmeteo = openmeteo_requests.Client(session = retry_session)
 
-# Function to fetch forecast data from Open-Meteo API
-def fetch_forecast_data(lat, lon, forecast_days=7):
+# Concurrent sessions asking for the same grid cells share one upstream request
+forecast_flights = SingleFlight()
+
+# Can be pointed at a local stand-in such as openmeteo_stub.py
+FORECAST_URL = os.environ.get('OPEN_METEO_FORECAST_URL', 'https://api.open-meteo.com/v1/forecast')
+
+def decode_hourly(responses, variables=HOURLY_VARIABLES, out=None):
     """
-    Fetch weather forecast data for renewable energy prediction
+    Decode the hourly block of Open-Meteo FlatBuffers responses into one float32 buffer
+    
+    Each variable is copied once, straight from the response buffer into its
+    column of the output. Responses are matched to columns by variable and
+    altitude, so the column order is always the order of `variables`.
     
     Parameters:
-    lat (float): Latitude of the location
-    lon (float): Longitude of the location
-    forecast_days (int): Number of days to forecast (max 16 days)
+    responses (list): WeatherApiResponse per location, as returned by openmeteo.weather_api
+    variables (list): Hourly variables that were requested
+    out (numpy.ndarray): Optional preallocated float32 array of shape (locations, hours, variables)
     
     Returns:
-    pandas.DataFrame: Hourly forecast data
+    tuple: (int64 epoch seconds of shape (locations, hours),
+            float32 array of shape (locations, hours, variables))
     """
-    url = "https://api.open-meteo.com/v1/forecast"
+    first = responses[0].Hourly()
+    n_hours = len(range(first.Time(), first.TimeEnd(), first.Interval()))
+    
+    shape = (len(responses), n_hours, len(variables))
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"Output buffer must be float32 with shape {shape}, got {out.dtype} {out.shape}")
     
+    # With timezone='auto' every location starts at its own local midnight
+    times = np.empty(shape[:2], dtype=np.int64)
+    columns = {variable_code(name): k for k, name in enumerate(variables)}
+    for i, response in enumerate(responses):
+        hourly = response.Hourly()
+        location_times = np.arange(hourly.Time(), hourly.TimeEnd(), hourly.Interval(), dtype=np.int64)
+        if len(location_times) != n_hours:
+            raise ValueError("All locations must cover the same number of hours")
+        times[i] = location_times
+        
+        for j in range(hourly.VariablesLength()):
+            variable = hourly.Variables(j)
+            # Fall back to the request order for variables the enum can't identify
+            k = columns.get((variable.Variable(), variable.Altitude()), j)
+            out[i, :, k] = variable.ValuesAsNumpy()
+    
+    return times, out
+
+def _frame_from_buffer(times, values):
+    """
+    Wrap one location's (hours, variables) slice of the decode buffer as a DataFrame
+    
+    The weather columns are views of the buffer rather than copies.
+    """
+    frame = pd.DataFrame(values, columns=HOURLY_VARIABLES, copy=False)
+    frame.insert(0, "datetime", pd.to_datetime(times, unit="s"))
+    return frame
+
+def _fetch_cells(cells, time_params):
+    """Request grid cells in one API call; returns a (times, values) pair per cell"""
     params = {
-        'latitude': lat,
-        'longitude': lon,
-        'hourly': [
-            "temperature_2m",
-            "relative_humidity_2m",
-            "wind_speed_10m",
-            "wind_speed_80m",
-            "wind_speed_120m",
-            "wind_direction_10m",
-            "wind_direction_80m",
-            "wind_direction_120m",
-            "wind_gusts_10m",
-            "cloud_cover",
-            "surface_pressure",
-            "vapour_pressure_deficit",
-        ],
-        'forecast_days': forecast_days,
-        'timezone': 'auto'
+        'latitude': [lat for lat, lon in cells],
+        'longitude': [lon for lat, lon in cells],
+        'hourly': HOURLY_VARIABLES,
+        'timezone': 'auto',
+        **time_params
     }
     
+    # One response per location, in request order
+    responses = openmeteo.weather_api(FORECAST_URL, params=params)
+    print(f"Processing forecast data for {len(responses)} grid cells")
+    times, values = decode_hourly(responses)
+    return [(times[i], values[i]) for i in range(len(cells))]
+
+def fetch_forecast_arrays(locations, forecast_days=7, resolution=GRID_RESOLUTION, start_hour=None, end_hour=None):
+    """
+    Fetch weather forecast data for many locations as arrays
+    
+    Locations are snapped to the upstream grid first (see locations.snap_to_grid):
+    each distinct cell is requested once and its forecast is copied to every
+    location in it. Cells another thread is already fetching with the same
+    variables and time window are not requested again; their result is shared
+    (see forecast_flights.stats()).
+    
+    Parameters:
+    locations (list): (lat, lon) pairs
+    forecast_days (int): Number of days to forecast (max 16 days)
+    resolution (float): Grid cell size in degrees (0 requests the raw coordinates)
+    start_hour (str): Optional first hour in local time ('YYYY-MM-DDTHH:MM'); with end_hour
+                      it replaces forecast_days
+    end_hour (str): Optional last hour in local time, inclusive
+    
+    Returns:
+    tuple: (int64 epoch seconds of shape (locations, hours),
+            float32 array of shape (locations, hours, variables)), or None if the request failed
+    """
+    if start_hour is not None and end_hour is not None:
+        time_params = {'start_hour': start_hour, 'end_hour': end_hour}
+    else:
+        time_params = {'forecast_days': forecast_days}
+    
+    cells, index = unique_cells(locations, resolution)
+    window = tuple(sorted(time_params.items()))
+    keys = [(lat, lon, tuple(HOURLY_VARIABLES), window) for lat, lon in cells]
+    
     try:
-        responses = openmeteo.weather_api(url, params=params)
-        
-        # Process first location (only one in this case)
-        response = responses[0]
-        print(f"Processing forecast data for coordinates {response.Latitude()}°N {response.Longitude()}°E")
-        
-        # Process hourly data
-        hourly = response.Hourly()
-        
-        # Create data dictionary with time index
-        hourly_data = {"time": pd.date_range(
-            start=pd.to_datetime(hourly.Time(), unit="s"),
-            end=pd.to_datetime(hourly.TimeEnd(), unit="s"),
-            freq=pd.Timedelta(seconds=hourly.Interval()),
-            inclusive="left"
-        )}
-        
-        # Add all weather variables to the dictionary
-        variable_indices = {
-            "temperature_2m": 0,
-            "relative_humidity_2m": 1,
-            "wind_speed_10m": 2,
-            "wind_speed_80m": 3,
-            "wind_speed_120m": 4,
-            "wind_direction_10m": 5,
-            "wind_direction_80m": 6,
-            "wind_direction_120m": 7,
-            "wind_gusts_10m": 8,
-            "cloud_cover": 9,
-            "surface_pressure": 10,
-            "vapour_pressure_deficit": 11
-        }
-        
-        for var_name, idx in variable_indices.items():
-            hourly_data[var_name] = hourly.Variables(idx).ValuesAsNumpy()
-        
-        # Create DataFrame
-        df = pd.DataFrame(data=hourly_data)
-        
-        # Rename 'time' to 'datetime' to match the rest of your code
-        df = df.rename(columns={"time": "datetime"})
-        
-        return df
+        per_cell = forecast_flights.do_many(
+            keys, lambda owned: _fetch_cells([key[:2] for key in owned], time_params)
+        )
+        print(f"Fetched forecast data for {len(cells)} grid cells ({len(locations)} locations)")
+        times = np.stack([cell_times for cell_times, cell_values in per_cell])
+        values = np.stack([cell_values for cell_times, cell_values in per_cell])
+        if len(cells) == len(locations):
+            # No shared cells, and cells are in location order
+            return times, values
+        return times[index], values[index]
         
     except Exception as e:
         print(f"Error fetching forecast data: {str(e)}")
         return None
+
+# Function to fetch forecast data from Open-Meteo API
+def fetch_forecast_data(lat, lon, forecast_days=7):
+    """
+    Fetch weather forecast data for renewable energy prediction
+    
+    Parameters:
+    lat (float): Latitude of the location
+    lon (float): Longitude of the location
+    forecast_days (int): Number of days to forecast (max 16 days)
+    
+    Returns:
+    pandas.DataFrame: Hourly forecast data
+    """
+    return fetch_forecast_data_bulk([(lat, lon)], forecast_days)[0]
+
+def fetch_forecast_data_bulk(locations, forecast_days=7):
+    """
+    Fetch weather forecast data for many locations in a single API request
+    
+    Parameters:
+    locations (list): (lat, lon) pairs
+    forecast_days (int): Number of days to forecast (max 16 days)
+    
+    Returns:
+    list: Hourly forecast DataFrame per location, in the same order as locations
+          (None for every location if the request failed)
+    """
+    if not locations:
+        return []
+    
+    arrays = fetch_forecast_arrays(locations, forecast_days)
+    if arrays is None:
+        return [None] * len(locations)
+    
+    # Every frame is a view of its location's slice of the shared buffer
+    times, values = arrays
+    return [_frame_from_buffer(times[i], values[i]) for i in range(len(locations))]
+
 class RenewableEnergyModels:
-    def __init__(self, model_dir='./saved_models'):
+    # Loaded from model_dir on first use, one energy type at a time
+    wind_model = LazyPart('wind', 'model')
+    wind_scaler = LazyPart('wind', 'scaler')
+    wind_compiled = LazyPart('wind', 'compiled')
+    solar_model = LazyPart('solar', 'model')
+    solar_scaler = LazyPart('solar', 'scaler')
+    solar_compiled = LazyPart('solar', 'compiled')
+    ocean_model = LazyPart('ocean', 'model')
+    ocean_scaler = LazyPart('ocean', 'scaler')
+    ocean_compiled = LazyPart('ocean', 'compiled')
+    
+    def __init__(self, model_dir='./saved_models', prefetch=False):
         """
-        Load pre-trained models and scalers from pickle files
+        Set up lazy loading of the pre-trained models and scalers
         
         Parameters:
         model_dir (str): Directory containing the saved model files
+        prefetch (bool or tuple): Energy types to start loading in the background
+                                  (True for all of them)
         """
         self.model_dir = model_dir
+        # Shared by every instance in this process; the compiled arrays are memory-mapped,
+        # so processes on the same host share one physical copy as well
+        self.loader = shared_loader(model_dir)
+        
+        if prefetch:
+            self.loader.prefetch(ENERGY_TYPES if prefetch is True else prefetch)
+    
+    def available(self, energy_type):
+        """Whether a model of this energy type was saved (checked without loading it)"""
+        return self.loader.available(energy_type)
+    
+    def version(self):
+        """Fingerprint of the saved model files; changes when the models are retrained"""
+        return self.loader.version()
+    
+    def predict_energy(self, energy_type, features):
+        """
+        Predict one energy type from its unscaled features
+        
+        Parameters:
+        energy_type (str): 'wind', 'solar' or 'ocean'
+        features (DataFrame): Features from prepare_features
         
-        # Load wind models
-        self.wind_model = self._load_pickle(os.path.join(model_dir, 'wind_model.pkl'))
-        self.wind_scaler = self._load_pickle(os.path.join(model_dir, 'wind_scaler.pkl'))
+        Returns:
+        ndarray: Predicted energy per row
+        """
+        # Compiled models compare unscaled features directly, so there is no transform pass
+        compiled = getattr(self, f'{energy_type}_compiled')
+        if compiled is not None:
+            return compiled.predict(features)
+        scaler = getattr(self, f'{energy_type}_scaler')
+        return getattr(self, f'{energy_type}_model').predict(scaler.transform(features))
+    
+    def prepare_features(self, data, energy_types=('wind', 'solar', 'ocean')):
+        """
+        Prepare the features of several models in one pass over the weather data
         
-        # Load solar models
-        self.solar_model = self._load_pickle(os.path.join(model_dir, 'solar_model.pkl'))
-        self.solar_scaler = self._load_pickle(os.path.join(model_dir, 'solar_scaler.pkl'))
+        Parameters:
+        data (DataFrame): Weather data, including the latitude of the location
+        energy_types (tuple): Models to prepare features for
         
-        # Load ocean models if available
-        ocean_model_path = os.path.join(model_dir, 'ocean_model.pkl')
-        if os.path.exists(ocean_model_path):
-            self.ocean_model = self._load_pickle(ocean_model_path)
-            self.ocean_scaler = self._load_pickle(os.path.join(model_dir, 'ocean_scaler.pkl'))
-        else:
-            self.ocean_model = None
-            self.ocean_scaler = None
-    
-    def _load_pickle(self, file_path):
-        """Load a pickle file"""
-        try:
-            with open(file_path, 'rb') as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-            return None
+        Returns:
+        dict: Energy type mapped to its features, in the column order its model was fitted on
+        """
+        builder = FeatureBuilder({energy_type: self.loader.feature_names(energy_type) for energy_type in energy_types})
+        return builder.build(data, energy_types)
     
     def prepare_wind_features(self, data):
         """
@@ -146,24 +265,7 @@ class RenewableEnergyModels:
         Returns:
         DataFrame: Features for wind energy prediction
         """
-        features = data[[
-                "wind_speed_10m",
-                "wind_speed_80m",
-                "wind_speed_120m",
-                "wind_gusts_10m",
-                "surface_pressure",
-                "hour",
-                "month",
-        ]].copy()
-        
-        # Convert wind direction to sine and cosine components
-        R = 287.05  # Gas constant for dry air in J/(kg·K)
-        features["temperature_kelvin"] = data["temperature_2m"] + 273.15
-        features["air_density"] = (
-            data["surface_pressure"] * 100 / (R * features["temperature_kelvin"])
-        )
-
-        return features
+        return self.prepare_features(data, ('wind',))['wind']
     
     def prepare_solar_features(self, data):
         """
@@ -175,28 +277,7 @@ class RenewableEnergyModels:
         Returns:
         DataFrame: Features for solar energy prediction
         """
-        features = data[[
-            "temperature_2m", "cloud_cover", "hour", "month", "day_of_year"
-        ]].copy()
-        
-        features["solar_zenith"] = 90 - 70 * np.sin(
-            np.pi * (data["hour"] - 6) / 12
-        ) * np.sin(np.pi * data["day_of_year"] / 365)
-
-        solar_constant = 1361
-
-        features["clearsky_irradiance"] = solar_constant * np.cos(
-            np.radians(features["solar_zenith"].clip(0, 90))
-        )
-        features["clearsky_irradiance"] = features[
-            "clearsky_irradiance"
-        ].clip(0, None)
-
-        features["estimated_irradiance"] = features[
-            "clearsky_irradiance"
-        ] * (1 - data["cloud_cover"] / 100 * 0.75)
-
-        return features
+        return self.prepare_features(data, ('solar',))['solar']
     
     def prepare_ocean_features(self, data):
         """
@@ -208,36 +289,24 @@ class RenewableEnergyModels:
         Returns:
         DataFrame: Features for ocean energy prediction
         """
-        features = data[[
-                "wind_speed_10m",
-                "wind_gusts_10m",
-                "surface_pressure",
-                "wind_direction_10m",
-                "hour",
-                "month",
-        ]].copy()
-        
-        features["estimated_wave_height"] = (
-            0.0015 * data["wind_speed_10m"] ** 2 * np.log(data["wind_gusts_10m"])
-        )
-
-        # Calculate simplified tide height based on lunar cycle (extremely simplified)
-        features["day_in_lunar_cycle"] = (data["day_of_year"] % 29.53).astype(int)
-        features["tide_factor"] = np.sin(
-            2 * np.pi * features["day_in_lunar_cycle"] / 29.53
-        )
-
-        return features
+        return self.prepare_features(data, ('ocean',))['ocean']
 
 class RenewableEnergyForecaster:
-    def __init__(self, trained_models):
+    def __init__(self, trained_models, cache=None):
         """
         Initialize forecaster with pre-trained models
         
         Parameters:
         trained_models (RenewableEnergyModels): Pre-trained models for wind, solar, and ocean energy
+        cache (ForecastCache): Optional cache of finished forecasts, reused while the
+                               models and the weather data are unchanged
         """
         self.models = trained_models
+        self.cache = cache
+        self._windows = {}  # District name -> last refreshed weather and energy (see refresh)
+    
+    def _cache_key(self, district_name, district_info, times, values):
+        return ForecastCache.key(self.models.version(), district_name, district_info, times, values)
     
     def forecast_district_energy(self, district_name, district_info, forecast_days=7):
         """
@@ -262,28 +331,395 @@ class RenewableEnergyForecaster:
         if forecast_data is None:
             return None
         
+        return self.forecast_from_data(district_name, district_info, forecast_data)
+    
+    def forecast_districts(self, districts_info, forecast_days=7):
+        """
+        Generate energy potential forecasts for many districts with one API request
+        
+        Parameters:
+        districts_info (dict): District names mapped to their lat, lon and coastal status
+        forecast_days (int): Number of days to forecast
+        
+        Returns:
+        dict: Forecast results per district (empty if the data could not be fetched)
+        """
+        return self.forecast_many(districts_info, forecast_days)
+    
+    def forecast_many(self, districts_info, forecast_days=7):
+        """
+        Forecast many districts with one API request and one predict call per model
+        
+        Parameters:
+        districts_info (dict): District names mapped to their lat, lon and coastal status
+        forecast_days (int): Number of days to forecast
+        
+        Returns:
+        dict: Forecast results per district, as forecast_from_data returns them
+              (empty if the data could not be fetched)
+        """
+        names = list(districts_info)
+        if not names:
+            return {}
+        
+        print(f"Fetching forecast data for {len(names)} districts...")
+        arrays = fetch_forecast_arrays(
+            [(districts_info[name]['lat'], districts_info[name]['lon']) for name in names],
+            forecast_days
+        )
+        if arrays is None:
+            return {}
+        
+        times, values = arrays
+        return self.forecast_from_arrays(districts_info, times, values)
+    
+    def forecast_from_arrays(self, districts_info, times, values):
+        """
+        Forecast many districts from decoded forecast arrays in one batch
+        
+        Districts whose forecast is cached for the same models and weather are
+        taken from the cache; only the rest are predicted.
+        
+        Parameters:
+        districts_info (dict): District names mapped to their lat, lon and coastal status,
+                               in the order of the arrays
+        times (numpy.ndarray): int64 epoch seconds of shape (districts, hours)
+        values (numpy.ndarray): float32 weather of shape (districts, hours, variables)
+        
+        Returns:
+        dict: Forecast results per district, as forecast_from_data returns them
+        """
+        names = list(districts_info)
+        if self.cache is None:
+            return self._forecast_batch(districts_info, times, values)
+        
+        keys = [self._cache_key(name, districts_info[name], times[i], values[i]) for i, name in enumerate(names)]
+        district_forecasts = {}
+        missing = []
+        for i, (name, key) in enumerate(zip(names, keys)):
+            cached = self.cache.get(key)
+            if cached is not None:
+                district_forecasts[name] = cached
+            else:
+                missing.append(i)
+        
+        if missing:
+            computed = self._forecast_batch(
+                {names[i]: districts_info[names[i]] for i in missing}, times[missing], values[missing]
+            )
+            for i in missing:
+                self.cache.put(keys[i], computed[names[i]])
+                district_forecasts[names[i]] = computed[names[i]]
+        
+        return {name: district_forecasts[name] for name in names}
+    
+    def refresh(self, districts_info, forecast_days=7, now=None):
+        """
+        Bring the forecasts of many districts up to date, fetching only what changed
+        
+        The first call fetches and predicts the whole forecast_days window and
+        keeps each district's weather and hourly energy. Later calls keep the
+        hours that have already passed, request only the current hour to the
+        end of the window (start_hour/end_hour), which is what a newer model
+        run changes, and merge them into the kept arrays in place. When the
+        window moves to a new day the kept rows shift and the new hours are
+        appended. Only rows whose weather changed are predicted again; the
+        daily sums and hourly means are then rebuilt from the kept energy.
+        
+        Parameters:
+        districts_info (dict): District names mapped to their lat, lon and coastal status
+        forecast_days (int): Number of days to forecast
+        now (float): Optional current time as epoch seconds
+        
+        Returns:
+        dict: Forecast results per district, as forecast_from_data returns them
+              (districts whose data could not be fetched are left out)
+        """
+        now = int(now if now is not None else datetime.now(timezone.utc).timestamp())
+        names = list(districts_info)
+        
+        # Districts with a usable kept window are grouped by the hours they need
+        full, partial = [], {}
+        for name in names:
+            info = districts_info[name]
+            window = self._windows.get(name)
+            if window is None or window['forecast_days'] != forecast_days or window['location'] != (info['lat'], info['lon']):
+                full.append(name)
+                continue
+            offset = window['utc_offset']
+            start = (now + offset) // 86400 * 86400 - offset
+            kept_start, kept_end = window['times'][0], window['times'][-1] + 3600
+            if not kept_start <= start < kept_end:
+                full.append(name)
+                continue
+            # The current hour of the window; half-hour time zones have their hours on the half hour
+            first = min(start + (now - start) // 3600 * 3600, kept_end)
+            partial.setdefault((first, start + forecast_days * 86400, offset), []).append(name)
+        
+        changed = {}
+        fetched_hours = 0
+        for (first, end, offset), group in partial.items():
+            # start_hour and end_hour are local times, both inclusive
+            arrays = fetch_forecast_arrays(
+                [(districts_info[name]['lat'], districts_info[name]['lon']) for name in group],
+                start_hour=datetime.fromtimestamp(first + offset, timezone.utc).strftime('%Y-%m-%dT%H:%M'),
+                end_hour=datetime.fromtimestamp(end - 3600 + offset, timezone.utc).strftime('%Y-%m-%dT%H:%M')
+            )
+            if arrays is None or arrays[0].shape[1] != (end - first) // 3600:
+                full.extend(group)
+                continue
+            times, values = arrays
+            fetched_hours += times.size
+            for i, name in enumerate(group):
+                changed[name] = self._merge_window(self._windows[name], end - forecast_days * 86400, first, values[i])
+        
+        if full:
+            arrays = fetch_forecast_arrays(
+                [(districts_info[name]['lat'], districts_info[name]['lon']) for name in full], forecast_days
+            )
+            if arrays is not None:
+                times, values = arrays
+                fetched_hours += times.size
+                for i, name in enumerate(full):
+                    info = districts_info[name]
+                    self._windows[name] = {
+                        'location': (info['lat'], info['lon']),
+                        'forecast_days': forecast_days,
+                        'utc_offset': int(-times[i, 0] % 86400),
+                        'times': times[i].copy(),
+                        'values': values[i].copy(),
+                        'energy': np.zeros((4, times.shape[1]))
+                    }
+                    changed[name] = np.ones(times.shape[1], dtype=bool)
+        
+        names = [name for name in names if name in changed]
+        if not names:
+            return {}
+        
+        # Predict the changed rows of every district at once and write them back
+        rows = [np.flatnonzero(changed[name]) for name in names]
+        predicted = sum(len(r) for r in rows)
+        if predicted:
+            windows = [self._windows[name] for name in names]
+            energy = self._predict_rows(
+                np.concatenate([w['times'][r] for w, r in zip(windows, rows)]),
+                np.concatenate([w['values'][r] for w, r in zip(windows, rows)]),
+                np.concatenate([np.full(len(r), districts_info[n]['lat']) for n, r in zip(names, rows)]),
+                np.concatenate([np.full(len(r), bool(districts_info[n]['coastal'])) for n, r in zip(names, rows)])
+            )
+            splits = np.cumsum([len(r) for r in rows])[:-1]
+            for w, r, part in zip(windows, rows, np.split(energy, splits, axis=1)):
+                w['energy'][:, r] = part
+        
+        selected = {name: districts_info[name] for name in names}
+        times = np.stack([self._windows[name]['times'] for name in names])
+        energy = np.concatenate([self._windows[name]['energy'] for name in names], axis=1)
+        district_forecasts = self._summarize(selected, times, energy)
+        print(f"Refreshed {len(names)} districts: fetched {fetched_hours} of {times.size} hours, "
+              f"predicted {predicted} rows")
+        
+        if self.cache is not None:
+            for name in names:
+                window = self._windows[name]
+                key = self._cache_key(name, districts_info[name], window['times'], window['values'])
+                self.cache.put(key, district_forecasts[name])
+        return district_forecasts
+    
+    def _merge_window(self, window, start, first, fetched):
+        """
+        Move a kept window to start at `start` and merge freshly fetched hours into it
+        
+        Parameters:
+        window (dict): Kept weather and energy of one district (see refresh)
+        start (int): New first hour of the window, as epoch seconds
+        first (int): First fetched hour, as epoch seconds
+        fetched (numpy.ndarray): float32 weather from `first` to the end of the window
+        
+        Returns:
+        numpy.ndarray: Mask of the rows whose weather changed or is new
+        """
+        n_hours = len(window['times'])
+        changed = np.zeros(n_hours, dtype=bool)
+        
+        # Shift out the days that have passed; the hours after the kept ones are new
+        shift = (start - window['times'][0]) // 3600
+        if shift:
+            window['values'][:n_hours - shift] = window['values'][shift:]
+            window['energy'][:, :n_hours - shift] = window['energy'][:, shift:]
+            window['times'] = np.arange(start, start + n_hours * 3600, 3600, dtype=np.int64)
+            changed[n_hours - shift:] = True
+        
+        # Missing values compare equal, so they don't count as changes
+        offset = (first - start) // 3600
+        kept = window['values'][offset:]
+        same = (kept == fetched) | (np.isnan(kept) & np.isnan(fetched))
+        changed[offset:] |= ~same.all(axis=1)
+        kept[:] = fetched
+        return changed
+    
+    def _forecast_batch(self, districts_info, times, values):
+        """
+        Predict many districts from decoded forecast arrays in one batch
+        
+        The hours of every district are stacked into one feature matrix per
+        model and predicted at once (ocean only on the rows of coastal
+        districts); the predictions are then split back into per-district
+        daily sums and hourly means with segment reductions.
+        """
+        names = list(districts_info)
+        n_hours = times.shape[1]
+        
+        # One row per (district, hour); each district's rows are contiguous
+        energy = self._predict_rows(
+            times.ravel(), values.reshape(-1, values.shape[2]),
+            np.repeat([districts_info[name]['lat'] for name in names], n_hours),
+            np.repeat([bool(districts_info[name]['coastal']) for name in names], n_hours)
+        )
+        return self._summarize(districts_info, times, energy)
+    
+    def _predict_rows(self, times, values, latitude, coastal):
+        """
+        Predict the energy of independent hourly rows
+        
+        Parameters:
+        times (numpy.ndarray): int64 epoch seconds of shape (rows,)
+        values (numpy.ndarray): float32 weather of shape (rows, variables)
+        latitude (numpy.ndarray): Latitude of each row's district
+        coastal (numpy.ndarray): Whether each row's district is coastal
+        
+        Returns:
+        numpy.ndarray: Wind, solar, ocean and total energy of shape (4, rows)
+        """
+        datetimes = pd.to_datetime(times, unit='s')
+        stacked = _frame_from_buffer(times, values)
+        stacked['hour'] = datetimes.hour
+        stacked['month'] = datetimes.month
+        stacked['day_of_year'] = datetimes.dayofyear
+        stacked['latitude'] = latitude
+        
+        coastal_rows = np.asarray(coastal, dtype=bool) & self.models.available('ocean')
+        features = self.models.prepare_features(
+            stacked, ('wind', 'solar', 'ocean') if coastal_rows.any() else ('wind', 'solar')
+        )
+        
+        # Rows: wind, solar, ocean and total energy
+        energy = np.zeros((4, len(stacked)))
+        energy[0] = self.models.predict_energy('wind', features['wind'])
+        energy[1] = self.models.predict_energy('solar', features['solar'])
+        if coastal_rows.any():
+            energy[2, coastal_rows] = self.models.predict_energy('ocean', features['ocean'][coastal_rows])
+        energy[3] = energy[0] + energy[1] + energy[2]
+        return energy
+    
+    def _summarize(self, districts_info, times, energy):
+        """
+        Split stacked hourly energy into each district's forecast results
+        
+        Parameters:
+        districts_info (dict): District names mapped to their lat, lon and coastal status,
+                               in the order of the rows
+        times (numpy.ndarray): int64 epoch seconds of shape (districts, hours)
+        energy (numpy.ndarray): Energy of shape (4, districts * hours), as _predict_rows returns it
+        
+        Returns:
+        dict: Forecast results per district, as forecast_from_data returns them
+        """
+        names = list(districts_info)
+        n_districts, n_hours = times.shape
+        flat_times = times.ravel()
+        datetimes = pd.to_datetime(flat_times, unit='s')
+        
+        # Daily sums: a segment starts at every new district and every new day
+        day = flat_times // 86400
+        row = np.arange(len(day))
+        day_starts = np.flatnonzero((row % n_hours == 0) | (np.diff(day, prepend=-1) != 0))
+        daily = np.add.reduceat(energy, day_starts, axis=1)
+        day_district = day_starts // n_hours
+        
+        # Hourly means: one bin per (district, hour of day)
+        hour_bins = np.repeat(np.arange(n_districts), n_hours) * 24 + datetimes.hour.to_numpy()
+        counts = np.bincount(hour_bins, minlength=n_districts * 24)
+        hourly = np.stack([
+            np.bincount(hour_bins, weights=energy[k], minlength=n_districts * 24) for k in range(4)
+        ])
+        
+        columns = ['wind_energy', 'solar_energy', 'ocean_energy', 'total_energy']
+        district_forecasts = {}
+        for i, name in enumerate(names):
+            rows = slice(i * n_hours, (i + 1) * n_hours)
+            days = day_district == i
+            daily_forecast = pd.DataFrame(
+                daily[:, days].T, columns=columns,
+                index=pd.Index(pd.to_datetime(day[day_starts[days]], unit='D').date, name='datetime')
+            )
+            bins = np.flatnonzero(counts[i * 24:(i + 1) * 24])
+            hourly_patterns = pd.DataFrame(
+                (hourly[:, i * 24 + bins] / counts[i * 24 + bins]).T, columns=columns,
+                index=pd.Index(bins.astype(np.int32), name='datetime')
+            )
+            hourly_forecast = pd.DataFrame({'datetime': datetimes[rows], **dict(zip(columns, energy[:, rows]))})
+            
+            district_forecasts[name] = {
+                'district': name,
+                'forecast_period': {
+                    'start': datetimes[rows].min().strftime('%Y-%m-%d'),
+                    'end': datetimes[rows].max().strftime('%Y-%m-%d')
+                },
+                'hourly_forecast': hourly_forecast,
+                'daily_forecast': daily_forecast,
+                'hourly_patterns': hourly_patterns,
+                'total_potential': {
+                    'wind': daily_forecast['wind_energy'].mean(),
+                    'solar': daily_forecast['solar_energy'].mean(),
+                    'ocean': daily_forecast['ocean_energy'].mean() if districts_info[name]['coastal'] else 0,
+                    'total': daily_forecast['total_energy'].mean()
+                }
+            }
+        
+        return district_forecasts
+    
+    def forecast_from_data(self, district_name, district_info, forecast_data):
+        """
+        Generate energy potential forecast from already fetched weather data
+        
+        Parameters:
+        district_name (str): Name of the district
+        district_info (dict): Information about the district including lat, lon, coastal status
+        forecast_data (DataFrame): Hourly forecast data from fetch_forecast_data
+        
+        Returns:
+        dict: Forecast results including daily and hourly predictions
+        """
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(
+                district_name, district_info,
+                forecast_data['datetime'].to_numpy().astype('datetime64[s]').view(np.int64),
+                np.stack([forecast_data[name].to_numpy(dtype=np.float32) for name in HOURLY_VARIABLES], axis=1)
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         # Add hour and month features
         forecast_data['hour'] = forecast_data['datetime'].dt.hour
         forecast_data['month'] = forecast_data['datetime'].dt.month
         forecast_data['day_of_year'] = forecast_data['datetime'].dt.dayofyear
+        forecast_data['latitude'] = district_info['lat']  # Solar geometry depends on latitude
         
-        # Prepare features for prediction
-        wind_features = self.models.prepare_wind_features(forecast_data)
-        solar_features = self.models.prepare_solar_features(forecast_data)
-        
-        # Scale features
-        wind_features_scaled = self.models.wind_scaler.transform(wind_features)
-        solar_features_scaled = self.models.solar_scaler.transform(solar_features)
+        # Prepare the features of every model in one pass
+        coastal = district_info['coastal'] and self.models.available('ocean')
+        features = self.models.prepare_features(
+            forecast_data, ('wind', 'solar', 'ocean') if coastal else ('wind', 'solar')
+        )
         
         # Make predictions
-        wind_predictions = self.models.wind_model.predict(wind_features_scaled)
-        solar_predictions = self.models.solar_model.predict(solar_features_scaled)
+        wind_predictions = self.models.predict_energy('wind', features['wind'])
+        solar_predictions = self.models.predict_energy('solar', features['solar'])
         
         # For ocean energy, only predict if coastal
-        if district_info['coastal'] and self.models.ocean_model is not None:
-            ocean_features = self.models.prepare_ocean_features(forecast_data)
-            ocean_features_scaled = self.models.ocean_scaler.transform(ocean_features)
-            ocean_predictions = self.models.ocean_model.predict(ocean_features_scaled)
+        if coastal:
+            ocean_predictions = self.models.predict_energy('ocean', features['ocean'])
         else:
             ocean_predictions = np.zeros(len(forecast_data))
         
@@ -309,7 +745,7 @@ class RenewableEnergyForecaster:
             'total_energy': 'mean'
         })
         
-        return {
+        result = {
             'district': district_name,
             'forecast_period': {
                 'start': forecast_data['datetime'].min().strftime('%Y-%m-%d'),
@@ -328,6 +764,10 @@ class RenewableEnergyForecaster:
                 'total': daily_forecast['total_energy'].mean()
             }
         }
+        
+        if key is not None:
+            self.cache.put(key, result)
+        return result
 
 def generate_forecast_report(district_forecasts):
     """
@@ -513,7 +953,7 @@ def main():
         models = RenewableEnergyModels(model_dir)
         
         # Check if models loaded successfully
-        if models.wind_model is None or models.solar_model is None:
+        if not models.available('wind') or not models.available('solar'):
             print("Error: Failed to load required models.")
             return
             
@@ -523,12 +963,7 @@ def main():
         return
     
     # Generate forecasts for all districts
-    district_forecasts = {}
-    for name, info in districts.items():
-        print(f"Generating forecast for {name}...")
-        forecast = forecaster.forecast_district_energy(name, info)
-        if forecast:
-            district_forecasts[name] = forecast
+    district_forecasts = forecaster.forecast_districts(districts)
     
     if not district_forecasts:
         print("Error: Failed to generate forecasts for any district.")
@@ -0,0 +1,88 @@
+import threading
+
+
+class _Call:
+    """One in-flight fetch of a key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Share in-flight fetches between concurrent callers
+
+    A caller asking for keys that another thread is already fetching waits
+    for that fetch and gets its result instead of fetching them again. Only
+    fetches still running are shared; finished results are not kept (the
+    HTTP and forecast caches do that).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.fetched = 0
+        self.shared = 0
+
+    def do_many(self, keys, fetch):
+        """
+        Return the result of every key, fetching only keys nobody is fetching yet
+
+        The keys this caller owns are fetched with a single fetch(owned_keys)
+        call, which must return one result per key in the same order. Its
+        exception, if any, is raised in every caller waiting on those keys.
+
+        Parameters:
+        keys (list): Hashable keys, e.g. one per location
+        fetch (callable): Fetches a list of keys
+
+        Returns:
+        list: Result per key, in the order of keys
+        """
+        calls, owned = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._calls:
+                    calls[key] = self._calls[key]
+                    self.shared += 1
+                else:
+                    calls[key] = self._calls[key] = _Call()
+                    owned.append(key)
+            self.fetched += len(owned)
+
+        # Fetch before waiting on other callers, so two callers waiting on each other both finish
+        if owned:
+            try:
+                results = fetch(owned)
+                for key, result in zip(owned, results):
+                    calls[key].result = result
+            except BaseException as e:
+                for key in owned:
+                    calls[key].error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        del self._calls[key]
+                for key in owned:
+                    calls[key].done.set()
+
+        results = []
+        for key in keys:
+            call = calls[key]
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results.append(call.result)
+        return results
+
+    def do(self, key, fetch):
+        """Single-key do_many: fetch() returns the result of key"""
+        return self.do_many([key], lambda owned: [fetch()])[0]
+
+    def stats(self):
+        """Keys fetched, and duplicate fetches saved by joining one in flight"""
+        with self._lock:
+            return {"fetched": self.fetched, "shared": self.shared, "in_flight": len(self._calls)}
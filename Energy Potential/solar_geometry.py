@@ -0,0 +1,68 @@
+from functools import lru_cache
+import numpy as np
+
+SOLAR_CONSTANT = 1361  # W/m²
+
+_DAYS = np.arange(1, 367)[:, None]  # Day of year 1..366 (leap years included)
+_HOURS = np.arange(24)[None, :]
+
+
+@lru_cache(maxsize=1024)
+def solar_tables(latitude):
+    """
+    Solar geometry for every (day_of_year, hour) at one latitude
+
+    Parameters:
+    latitude (float): Latitude in degrees
+
+    Returns:
+    tuple: (zenith angle in degrees, cos(zenith), clear-sky irradiance in W/m²),
+           each a read-only array of shape (366, 24) indexed by [day_of_year - 1, hour]
+    """
+    # Calculate solar declination (seasonal variation)
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (_DAYS - 81) / 365)
+
+    # Hour angle (15° per hour from solar noon)
+    hour_angle = np.radians(15 * (_HOURS - 12))
+
+    # Solar zenith angle formula
+    zenith = np.arccos(
+        np.sin(np.radians(latitude)) * np.sin(declination) +
+        np.cos(np.radians(latitude)) * np.cos(declination) * np.cos(hour_angle)
+    )
+    cos_zenith = np.cos(zenith)
+    clearsky = np.clip(SOLAR_CONSTANT * cos_zenith, 0, None)
+
+    tables = (np.degrees(zenith), cos_zenith, clearsky)
+    for table in tables:
+        table.setflags(write=False)  # Shared between callers through the cache
+    return tables
+
+
+def _gather(table_index, hour, day_of_year, latitude):
+    """Look up one of the solar tables for every row"""
+    hour = np.asarray(hour, dtype=np.int64)
+    day = np.asarray(day_of_year, dtype=np.int64) - 1
+    latitude = np.broadcast_to(np.asarray(latitude, dtype=np.float64), hour.shape)
+
+    # Rows usually come from a handful of sites, so build one table per distinct latitude
+    latitudes, inverse = np.unique(np.round(latitude, 4), return_inverse=True)
+    if len(latitudes) == 1:
+        return solar_tables(float(latitudes[0]))[table_index][day, hour]
+    stacked = np.stack([solar_tables(float(lat))[table_index] for lat in latitudes])
+    return stacked[inverse.reshape(hour.shape), day, hour]
+
+
+def solar_zenith(hour, day_of_year, latitude):
+    """Solar zenith angle in degrees for every row"""
+    return _gather(0, hour, day_of_year, latitude)
+
+
+def cos_zenith(hour, day_of_year, latitude):
+    """Cosine of the solar zenith angle for every row"""
+    return _gather(1, hour, day_of_year, latitude)
+
+
+def clearsky_irradiance(hour, day_of_year, latitude):
+    """Clear-sky irradiance in W/m² for every row (zero when the sun is down)"""
+    return _gather(2, hour, day_of_year, latitude)
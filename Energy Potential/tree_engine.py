@@ -0,0 +1,416 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+
+# Arrays of a compiled ensemble, stored one after another in a single file
+ARRAY_NAMES = ["feature", "threshold", "children", "is_leaf", "missing_left", "value", "roots"]
+
+MAGIC = b"TREEARR1"
+ALIGNMENT = 64  # Every array starts on a cache line
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def round_down_float32(threshold):
+    """
+    Largest float32 that is <= each float64 threshold
+
+    For any float32 x, x <= t holds exactly when x <= round_down_float32(t), so
+    float32 thresholds make the same split decisions as the originals.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+def _float32_order(values):
+    """Map float32 values to int64 keys that sort in the same order as the floats"""
+    bits = np.asarray(values, dtype=np.float32).view(np.int32).astype(np.int64)
+    return np.where(bits < 0, -(bits & 0x7FFFFFFF), bits)
+
+
+def _float32_from_order(keys):
+    """Inverse of _float32_order"""
+    bits = np.where(keys < 0, -keys | 0x80000000, keys)
+    return bits.astype(np.uint32).view(np.float32)
+
+
+def raw_thresholds(threshold, mean, scale):
+    """
+    Thresholds on unscaled float32 features that split exactly like the scaled ones
+
+    StandardScaler.transform computes (x - mean) / scale in float32 for float32
+    input, which never decreases as x grows. For every split this finds the
+    largest float32 x whose scaled value is still <= the threshold by
+    bisecting over the ordered float32 bit patterns.
+
+    Parameters:
+    threshold (ndarray): float32 thresholds on scaled features
+    mean (ndarray): Scaler mean of the feature each threshold tests, as float32
+    scale (ndarray): Scaler scale of the feature each threshold tests, as float32
+
+    Returns:
+    ndarray: float32 thresholds on the raw features
+    """
+    def goes_left(keys):
+        x = _float32_from_order(keys)
+        with np.errstate(over="ignore", invalid="ignore"):
+            return (x - mean) / scale <= threshold
+
+    largest = np.float32(np.finfo(np.float32).max)
+    low = np.full(len(threshold), _float32_order(-largest))   # Always goes left (checked below)
+    high = np.full(len(threshold), _float32_order(largest) + 1)  # Treated as going right
+    none_left = ~goes_left(low)
+    while np.any(high - low > 1):
+        middle = (low + high) // 2
+        left = goes_left(middle)
+        low = np.where(left, middle, low)
+        high = np.where(left, high, middle)
+
+    raw = _float32_from_order(low)
+    raw[none_left] = -np.inf
+    return raw
+
+
+def _sklearn_tree_nodes(tree, scale=1.0):
+    """Nodes of a fitted sklearn Tree as (feature, threshold, left, right, value, missing_left, depth)"""
+    is_leaf = tree.children_left == -1
+    missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+    return (tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            scale * tree.value[:, 0, 0], missing_left, is_leaf, tree.max_depth)
+
+
+def _hist_predictor_nodes(predictor):
+    """Nodes of a HistGradientBoosting TreePredictor in the same layout"""
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise ValueError("Categorical splits are not supported")
+    is_leaf = nodes["is_leaf"].astype(bool)
+    return (nodes["feature_idx"], nodes["num_threshold"], nodes["left"], nodes["right"],
+            nodes["value"], nodes["missing_go_to_left"], is_leaf, int(nodes["depth"].max()))
+
+
+class CompiledEnsemble:
+    """
+    A fitted tree ensemble flattened into contiguous node arrays
+
+    All trees share one set of node arrays (feature, threshold, children,
+    leaf flag, missing-value direction, leaf value); roots holds the first
+    node of each tree. children interleaves the (right, left) child of every
+    node, so the next node is children[2 * node + goes_left]. A batch
+    descends all trees at once, one level per vectorized step, and (row,
+    tree) pairs that reach a leaf drop out of the working set.
+
+    Thresholds are float32 rounded down, which makes exactly the decisions
+    sklearn makes on its float32 inputs. Leaf values stay float64 and are
+    summed tree by tree in sklearn's order, so predictions match sklearn's
+    bit for bit.
+    """
+
+    def __init__(self, arrays, meta):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.is_leaf = arrays["is_leaf"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.meta = meta
+
+        self.kind = meta["kind"]  # "mean" (forests) or "sum" (boosting)
+        self.baseline = meta["baseline"]
+        self.max_depth = meta["max_depth"]
+        self.n_features = meta["n_features"]
+        self.feature_names = meta.get("feature_names")
+        self.has_missing_left = meta["has_missing_left"]
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForest, GradientBoosting or HistGradientBoosting regressor"""
+        if isinstance(model, RandomForestRegressor):
+            trees = [_sklearn_tree_nodes(tree.tree_) for tree in model.estimators_]
+            kind, baseline = "mean", 0.0
+        elif isinstance(model, GradientBoostingRegressor):
+            if model.loss != "squared_error":
+                raise ValueError(f"Unsupported loss '{model.loss}'")
+            # Stages add learning_rate * leaf value; the product is rounded the same way here
+            trees = [_sklearn_tree_nodes(tree.tree_, model.learning_rate) for tree in model.estimators_[:, 0]]
+            kind = "sum"
+            baseline = 0.0 if model.init_ == "zero" else float(model.init_.constant_.ravel()[0])
+        elif isinstance(model, HistGradientBoostingRegressor):
+            if model.loss != "squared_error":
+                raise ValueError(f"Unsupported loss '{model.loss}'")
+            trees = [_hist_predictor_nodes(predictors[0]) for predictors in model._predictors]
+            kind, baseline = "sum", float(model._baseline_prediction.ravel()[0])
+        else:
+            raise TypeError(f"Can't compile {type(model).__name__}")
+
+        sizes = [len(tree[0]) for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        total = int(sum(sizes))
+
+        arrays = {
+            "feature": np.zeros(total, dtype=np.int32),
+            "threshold": np.zeros(total, dtype=np.float32),
+            "children": np.empty(2 * total, dtype=np.int32),
+            "is_leaf": np.zeros(total, dtype=bool),
+            "missing_left": np.zeros(total, dtype=bool),
+            "value": np.empty(total, dtype=np.float64),
+            "roots": offsets.astype(np.int32),
+        }
+        max_depth = 0
+        for offset, (feature, threshold, left, right, value, missing_left, is_leaf, depth) in zip(offsets, trees):
+            nodes = slice(offset, offset + len(feature))
+            # Leaves point to themselves
+            own_index = offset + np.arange(len(feature))
+            arrays["feature"][nodes] = np.where(is_leaf, 0, feature)
+            arrays["threshold"][nodes] = np.where(is_leaf, 0, round_down_float32(threshold))
+            arrays["children"][2 * offset:2 * nodes.stop:2] = np.where(is_leaf, own_index, offset + np.asarray(right, dtype=np.int64))
+            arrays["children"][2 * offset + 1:2 * nodes.stop:2] = np.where(is_leaf, own_index, offset + np.asarray(left, dtype=np.int64))
+            arrays["is_leaf"][nodes] = is_leaf
+            arrays["missing_left"][nodes] = missing_left
+            arrays["value"][nodes] = value
+            max_depth = max(max_depth, depth)
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        meta = {
+            "model_type": type(model).__name__,
+            "kind": kind,
+            "baseline": baseline,
+            "max_depth": int(max_depth),
+            "n_trees": len(trees),
+            "n_nodes": total,
+            "n_features": int(model.n_features_in_),
+            "feature_names": list(feature_names) if feature_names is not None else None,
+            "has_missing_left": bool(arrays["missing_left"].any()),
+        }
+        return cls(arrays, meta)
+
+    def fold_scaler(self, scaler):
+        """
+        Fold a fitted StandardScaler into the split thresholds
+
+        The returned ensemble takes unscaled float32 features (as FeatureBuilder
+        produces them) and predicts exactly what the model predicts on
+        scaler.transform of the same features, without the transform pass.
+        """
+        if self.meta.get("scaler_folded"):
+            raise ValueError("A scaler is already folded into this ensemble")
+        n_features = self.n_features
+        mean = np.zeros(n_features) if scaler.mean_ is None or not scaler.with_mean else scaler.mean_
+        scale = np.ones(n_features) if scaler.scale_ is None or not scaler.with_std else scaler.scale_
+
+        # Leaves keep their (unused) zero threshold
+        splits = ~self.is_leaf
+        feature = self.feature[splits]
+        threshold = np.array(self.threshold)
+        threshold[splits] = raw_thresholds(
+            self.threshold[splits], mean.astype(np.float32)[feature], scale.astype(np.float32)[feature]
+        )
+
+        arrays = {name: np.asarray(getattr(self, name)) for name in ARRAY_NAMES}
+        arrays["threshold"] = threshold
+        feature_names = getattr(scaler, "feature_names_in_", None)
+        meta = dict(self.meta, scaler_folded=True)
+        if feature_names is not None:
+            meta["feature_names"] = list(feature_names)
+        return CompiledEnsemble(arrays, meta)
+
+    def _predict_chunk(self, X):
+        feature, threshold, children, is_leaf = self.feature, self.threshold, self.children, self.is_leaf
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        X_flat = X.ravel()
+
+        # One entry per (row, tree) pair; pairs drop out as soon as they reach a leaf.
+        # Indices are always in range, so take(mode="clip") skips the bounds checks.
+        nodes = np.tile(self.roots.astype(np.int64), n_rows)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, n_trees)
+        pairs = np.arange(n_rows * n_trees)
+        leaves = nodes.copy()
+
+        done = is_leaf.take(nodes, mode="clip")
+        while len(nodes):
+            if done.any():
+                leaves[pairs[done]] = nodes[done]
+                active = ~done
+                nodes, row_offsets, pairs = nodes.compress(active), row_offsets.compress(active), pairs.compress(active)
+                if not len(nodes):
+                    break
+
+            x = X_flat.take(row_offsets + feature.take(nodes, mode="clip"), mode="clip")
+            goes_left = x <= threshold.take(nodes, mode="clip")
+            if self.has_missing_left:
+                goes_left |= np.isnan(x) & self.missing_left.take(nodes, mode="clip")
+            nodes = children.take(2 * nodes + goes_left, mode="clip")
+            done = is_leaf.take(nodes, mode="clip")
+
+        # Accumulate tree by tree from the baseline, in the same order and precision as sklearn;
+        # cumsum adds sequentially (unlike sum, which adds pairwise)
+        totals = np.empty((n_rows, n_trees + 1), dtype=np.float64)
+        totals[:, 0] = self.baseline
+        totals[:, 1:] = self.value.take(leaves).reshape(n_rows, n_trees)
+        out = np.cumsum(totals, axis=1, out=totals)[:, -1].copy()
+        if self.kind == "mean":
+            out /= n_trees
+        return out
+
+    def predict(self, X, chunk_size=2048):
+        """Predict a batch; X is cast to float32 like sklearn's trees do"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        if len(X) <= chunk_size:
+            return self._predict_chunk(X)
+        return np.concatenate([self._predict_chunk(X[i:i + chunk_size]) for i in range(0, len(X), chunk_size)])
+
+    def save(self, path):
+        """
+        Save as a single file: a JSON header followed by the arrays, each cache-line aligned
+
+        The file is written next to its destination and renamed into place, so
+        processes that already mapped the previous version keep a consistent copy.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        arrays = [(name, np.ascontiguousarray(getattr(self, name))) for name in ARRAY_NAMES]
+        layout = {}
+        offset = 0
+        for name, array in arrays:
+            layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset = _align(offset + array.nbytes)
+        header = json.dumps({"meta": self.meta, "arrays": layout}).encode()
+        data_start = _align(len(MAGIC) + 8 + len(header))
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, array in arrays:
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+        print(f"Compiled {self.meta['model_type']} saved to {path}")
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a saved ensemble
+
+        With mmap the file is mapped rather than read: loading costs no more
+        than parsing the header, and every process on the host shares the
+        same physical pages through the page cache.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compiled tree ensemble")
+            header_size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_size))
+        data_start = _align(len(MAGIC) + 8 + header_size)
+
+        buffer = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = data_start + spec["offset"]
+            size = int(np.prod(spec["shape"])) * dtype.itemsize
+            # Plain ndarray views skip the memmap subclass overhead on every gather
+            arrays[name] = buffer[start:start + size].view(np.ndarray).view(dtype).reshape(spec["shape"])
+        return cls(arrays, header["meta"])
+
+
+def compiled_path(model_dir, energy_type):
+    """Where the compiled copy of an energy type's model is saved"""
+    return os.path.join(model_dir, "compiled", f"{energy_type}.bin")
+
+
+def compile_model(model, scaler=None):
+    """Flatten a fitted sklearn tree ensemble into a CompiledEnsemble, folding in its scaler if given"""
+    compiled = CompiledEnsemble.from_sklearn(model)
+    if scaler is not None:
+        compiled = compiled.fold_scaler(scaler)
+    return compiled
+
+
+def _load_pickle(path):
+    """Unpickle a file, or None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def export_models(model_dir="saved_models", output_dir=None, energy_types=("wind", "solar", "ocean")):
+    """
+    Compile every pickled model found in model_dir, folding in its scaler
+
+    Returns:
+    dict: Energy type mapped to its CompiledEnsemble
+    """
+    output_dir = output_dir or model_dir
+    compiled = {}
+    for energy_type in energy_types:
+        model = _load_pickle(os.path.join(model_dir, f"{energy_type}_model.pkl"))
+        if model is None:
+            continue
+        scaler = _load_pickle(os.path.join(model_dir, f"{energy_type}_scaler.pkl"))
+        compiled[energy_type] = compile_model(model, scaler)
+        compiled[energy_type].save(compiled_path(output_dir, energy_type))
+    return compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export pickled energy models as compiled tree arrays")
+    parser.add_argument("--model-dir", default="saved_models")
+    parser.add_argument("--output-dir", default=None, help="Writes <output-dir>/compiled/<type>.bin (defaults to --model-dir)")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.model_dir
+    export_models(args.model_dir, output_dir)
+
+    # Compare loading and predicting against the pickled models and scalers
+    for energy_type in ("wind", "solar", "ocean"):
+        path = compiled_path(output_dir, energy_type)
+        if not os.path.exists(path):
+            continue
+
+        start = time.perf_counter()
+        model = _load_pickle(os.path.join(args.model_dir, f"{energy_type}_model.pkl"))
+        scaler = _load_pickle(os.path.join(args.model_dir, f"{energy_type}_scaler.pkl"))
+        pickle_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = CompiledEnsemble.load(path)
+        compiled_load = time.perf_counter() - start
+
+        # A week of unscaled features spread like the training data
+        X = np.random.default_rng(0).normal(size=(168, compiled.n_features))
+        if scaler is not None:
+            X = X * scaler.scale_ + scaler.mean_
+        X = pd.DataFrame(X.astype(np.float32), columns=compiled.feature_names)
+        start = time.perf_counter()
+        expected = model.predict(scaler.transform(X) if scaler is not None else X)
+        pickle_predict = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = compiled.predict(X)
+        compiled_predict = time.perf_counter() - start
+
+        print(f"{energy_type}: load {pickle_load * 1000:.1f} ms -> {compiled_load * 1000:.1f} ms, "
+              f"predict 168 rows {pickle_predict * 1000:.2f} ms -> {compiled_predict * 1000:.2f} ms, "
+              f"identical: {np.array_equal(expected, actual)}")
+
+
+if __name__ == "__main__":
+    main()
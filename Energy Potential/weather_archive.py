@@ -0,0 +1,120 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from weather_download import HOURLY_VARIABLES
+
+
+class WeatherArchive:
+    """
+    Persistent hourly weather archive, one Parquet file per location and month
+
+    Layout: <root>/<lat>_<lon>/<YYYY-MM>.parquet with a 'datetime' column and one
+    column per weather variable. Reads only load the months and columns that
+    are asked for, and missing_ranges() tells callers exactly which hours still
+    have to be downloaded.
+    """
+
+    def __init__(self, root="weather_archive"):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def location_dir(self, lat, lon):
+        return os.path.join(self.root, f"{lat:.4f}_{lon:.4f}")
+
+    def _month_path(self, lat, lon, month):
+        return os.path.join(self.location_dir(lat, lon), f"{month}.parquet")
+
+    @staticmethod
+    def _hour_range(start_date, end_date):
+        """Every hour of an inclusive YYYY-MM-DD date range"""
+        return pd.date_range(start_date, pd.Timestamp(end_date) + pd.Timedelta(hours=23), freq="h")
+
+    def _read_month(self, lat, lon, month, columns=None):
+        path = self._month_path(lat, lon, month)
+        if not os.path.exists(path):
+            return None
+        if columns is not None:
+            columns = ["datetime"] + [c for c in columns if c != "datetime"]
+        return pd.read_parquet(path, columns=columns)
+
+    def write(self, lat, lon, df):
+        """
+        Merge hourly rows into the archive; newer rows replace archived ones for the same hour
+
+        Parameters:
+        lat (float): Latitude of the location
+        lon (float): Longitude of the location
+        df (DataFrame): Hourly data with a 'datetime' column
+        """
+        variables = [c for c in HOURLY_VARIABLES if c in df.columns]
+        df = df[["datetime"] + variables]
+        # Hours the API has no data for yet are left out so they are fetched again later
+        df = df.dropna(subset=variables, how="all")
+        if df.empty:
+            return
+
+        os.makedirs(self.location_dir(lat, lon), exist_ok=True)
+        with self._lock:
+            for period, part in df.groupby(df["datetime"].dt.to_period("M")):
+                month = str(period)
+                existing = self._read_month(lat, lon, month)
+                if existing is not None:
+                    part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates(subset="datetime", keep="last").sort_values("datetime")
+
+                path = self._month_path(lat, lon, month)
+                tmp_path = f"{path}.tmp"
+                part.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, path)
+
+    def read(self, lat, lon, start_date, end_date, columns=None):
+        """
+        Read archived hours of an inclusive date range
+
+        Parameters:
+        columns (list): Weather variables to load (all when None); 'datetime' is always included
+
+        Returns:
+        pandas.DataFrame: Archived rows in the range, sorted by time (None if there are none)
+        """
+        hours = self._hour_range(start_date, end_date)
+        frames = []
+        for period in pd.period_range(hours[0], hours[-1], freq="M"):
+            part = self._read_month(lat, lon, str(period), columns)
+            if part is not None:
+                frames.append(part[(part["datetime"] >= hours[0]) & (part["datetime"] <= hours[-1])])
+
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+    def missing_ranges(self, lat, lon, start_date, end_date, merge_within=24):
+        """
+        Contiguous runs of hours in a date range that are not archived yet
+
+        Parameters:
+        merge_within (int): Missing hours at most this many hours apart share a run,
+                            so scattered gaps don't turn into many tiny requests
+
+        Returns:
+        list: (first_hour, last_hour) Timestamp pairs, both inclusive
+        """
+        hours = self._hour_range(start_date, end_date)
+        archived = self.read(lat, lon, start_date, end_date, columns=[])
+        if archived is not None:
+            hours = hours.difference(pd.DatetimeIndex(archived["datetime"]))
+        if hours.empty:
+            return []
+
+        # A new run starts wherever consecutive missing hours are too far apart
+        starts = np.flatnonzero((hours[1:] - hours[:-1]) > pd.Timedelta(hours=merge_within)) + 1
+        firsts = np.concatenate([[0], starts])
+        lasts = np.concatenate([starts - 1, [len(hours) - 1]])
+        return [(hours[first], hours[last]) for first, last in zip(firsts, lasts)]
+
+    def missing_days(self, lat, lon, start_date, end_date):
+        """Inclusive YYYY-MM-DD date ranges covering every missing hour"""
+        return [(first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d"))
+                for first, last in self.missing_ranges(lat, lon, start_date, end_date)]
@@ -0,0 +1,219 @@
+import os
+import re
+import json
+import threading
+import pandas as pd
+import requests
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from openmeteo_sdk.Variable import Variable
+
+# Can be pointed at a local stand-in such as openmeteo_stub.py
+HISTORICAL_URL = os.environ.get("OPEN_METEO_HISTORICAL_URL", "https://historical-forecast-api.open-meteo.com/v1/forecast")
+
+# Hourly weather variables used by the energy models
+HOURLY_VARIABLES = [
+    "temperature_2m",
+    "relative_humidity_2m",
+    "wind_speed_10m",
+    "wind_speed_80m",
+    "wind_speed_120m",
+    "wind_direction_10m",
+    "wind_direction_80m",
+    "wind_direction_120m",
+    "wind_gusts_10m",
+    "cloud_cover",
+    "surface_pressure",
+    "vapour_pressure_deficit",
+]
+
+
+def variable_code(name):
+    """
+    Open-Meteo variable enum and altitude of an hourly variable name
+
+    FlatBuffers responses identify variables this way, e.g. wind_speed_80m is
+    (Variable.wind_speed, 80) and cloud_cover is (Variable.cloud_cover, 0).
+    """
+    match = re.fullmatch(r"(.+)_(\d+)m", name)
+    if match and hasattr(Variable, match.group(1)):
+        return getattr(Variable, match.group(1)), int(match.group(2))
+    return getattr(Variable, name, Variable.undefined), 0
+
+
+def make_session(pool_size=16, retries=5, backoff_factor=0.5):
+    """
+    Create a pooled HTTP session that retries transient failures
+
+    Parameters:
+    pool_size (int): Maximum number of connections kept open per host
+    retries (int): Number of retries for connection errors and 429/5xx responses
+    backoff_factor (float): Exponential backoff factor between retries
+
+    Returns:
+    requests.Session: Session shared by all download threads
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def split_date_range(start_date, end_date, chunk_days=31):
+    """
+    Split an inclusive YYYY-MM-DD date range into consecutive chunks
+
+    Returns:
+    list: (start, end) date strings, both inclusive
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+class HistoricalWeatherDownloader:
+    """
+    Download hourly weather history for many locations concurrently
+
+    Each location's date range is split into chunks that are fetched in parallel
+    over one pooled session, with at most max_concurrency requests in flight.
+    Every completed chunk is checkpointed to disk, so an interrupted backfill
+    only fetches the chunks that are still missing when it is run again.
+
+    With a WeatherArchive, completed chunks are merged into the archive instead
+    and only the days the archive is missing are requested at all.
+    """
+
+    def __init__(self, checkpoint_dir="weather_chunks", base_url=HISTORICAL_URL,
+                 max_concurrency=8, chunk_days=31, session=None, timeout=60, archive=None):
+        self.checkpoint_dir = checkpoint_dir
+        self.archive = archive
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.chunk_days = chunk_days
+        self.session = session or make_session(pool_size=max_concurrency)
+        self.timeout = timeout
+
+    def _chunk_path(self, name, start, end):
+        return os.path.join(self.checkpoint_dir, name.lower(), f"{start}_{end}.json")
+
+    def _is_final(self, end):
+        """Chunks reaching into today may still change and are never reused"""
+        return end < datetime.now().strftime("%Y-%m-%d")
+
+    def fetch_chunk(self, lat, lon, start, end):
+        """Fetch one date chunk and return the 'hourly' block of the JSON response"""
+        params = {
+            "latitude": lat,
+            "longitude": lon,
+            "start_date": start,
+            "end_date": end,
+            "hourly": HOURLY_VARIABLES,
+        }
+        response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if "hourly" not in data:
+            raise ValueError(f"Unexpected response: {data}")
+        return data["hourly"]
+
+    def _download_chunk(self, name, lat, lon, start, end):
+        hourly = self.fetch_chunk(lat, lon, start, end)
+
+        if self.archive is not None:
+            df = pd.DataFrame(hourly)
+            df["datetime"] = pd.to_datetime(df["time"])
+            self.archive.write(lat, lon, df)
+            return hourly
+
+        # Write to a temporary file first so a crash never leaves a partial checkpoint
+        path = self._chunk_path(name, start, end)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(hourly, f)
+        os.replace(tmp_path, path)
+        return hourly
+
+    def _load_chunk(self, name, start, end):
+        with open(self._chunk_path(name, start, end)) as f:
+            return json.load(f)
+
+    def download(self, locations, start_date, end_date):
+        """
+        Download weather history for every location
+
+        Parameters:
+        locations (dict): Location names mapped to dicts with 'lat' and 'lon'
+        start_date (str): First day, YYYY-MM-DD
+        end_date (str): Last day (inclusive), YYYY-MM-DD
+
+        Returns:
+        dict: Location name mapped to an hourly DataFrame, or None if any chunk failed
+        """
+        chunks = split_date_range(start_date, end_date, self.chunk_days)
+
+        pending = []
+        for name, info in locations.items():
+            if self.archive is not None:
+                # Chunk only the days the archive doesn't cover yet
+                for first, last in self.archive.missing_days(info["lat"], info["lon"], start_date, end_date):
+                    for start, end in split_date_range(first, last, self.chunk_days):
+                        pending.append((name, info["lat"], info["lon"], start, end))
+                continue
+            for start, end in chunks:
+                if self._is_final(end) and os.path.exists(self._chunk_path(name, start, end)):
+                    continue
+                pending.append((name, info["lat"], info["lon"], start, end))
+
+        print(f"Downloading {len(pending)} chunks for {len(locations)} locations "
+              f"({self.max_concurrency} concurrent requests)")
+
+        fetched = {}
+        failed = set()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(self._download_chunk, *task): task for task in pending}
+            for future in as_completed(futures):
+                name, _, _, start, end = futures[future]
+                try:
+                    fetched[(name, start, end)] = future.result()
+                except Exception as e:
+                    failed.add(name)
+                    print(f"Error fetching {name} {start} to {end}: {e}")
+
+        results = {}
+        for name in locations:
+            if name in failed:
+                results[name] = None
+                continue
+
+            if self.archive is not None:
+                info = locations[name]
+                results[name] = self.archive.read(info["lat"], info["lon"], start_date, end_date)
+                continue
+
+            frames = []
+            for start, end in chunks:
+                key = (name, start, end)
+                hourly = fetched[key] if key in fetched else self._load_chunk(name, start, end)
+                frames.append(pd.DataFrame(hourly))
+
+            df = pd.concat(frames, ignore_index=True).drop_duplicates(subset="time")
+            df["datetime"] = pd.to_datetime(df["time"])
+            results[name] = df.reset_index(drop=True)
+
+        return results